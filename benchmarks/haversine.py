@@ -0,0 +1,38 @@
+"""
+    Compare vectorized haversine functions to loops over scalar haversine.
+    Reports timings only, run with: python benchmarks/haversine.py
+"""
+import random
+import timeit
+from painless_sqlalchemy.util import LocationUtil
+
+
+def random_locations(count, seed):
+    rnd = random.Random(seed)
+    return [(rnd.uniform(-180, 180), rnd.uniform(-90, 90)) for _ in range(count)]
+
+
+def run(count=2000, repeat=5):
+    location = random_locations(1, 0)[0]
+    locations = random_locations(count, 1)
+    locations2 = random_locations(count // 10, 2)
+    cases = [
+        ("haversine_many (%d)" % count, lambda: [
+            LocationUtil.haversine(location[0], location[1], l[0], l[1])
+            for l in locations
+        ], lambda: LocationUtil.haversine_many(location, locations)),
+        ("haversine_matrix (%dx%d)" % (count, len(locations2)), lambda: [[
+            LocationUtil.haversine(l1[0], l1[1], l2[0], l2[1])
+            for l2 in locations2
+        ] for l1 in locations], lambda: LocationUtil.haversine_matrix(
+            locations, locations2))
+    ]
+    for name, scalar, vectorized in cases:
+        scalar_time = min(timeit.repeat(scalar, number=1, repeat=repeat))
+        vectorized_time = min(timeit.repeat(vectorized, number=1, repeat=repeat))
+        print("%s: scalar loop %.4fs, vectorized %.4fs (x%.1f)" % (
+            name, scalar_time, vectorized_time, scalar_time / vectorized_time))
+
+
+if __name__ == '__main__':
+    run()
@@ -1,11 +1,82 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.sql.dml import UpdateBase
 from painless_sqlalchemy.core.Model import Model
+from painless_sqlalchemy.util import CacheUtil
+
+
+def _after_flush(session, flush_context):  # pylint: disable=unused-argument
+    """ Collect tables of flushed objects """
+    CacheUtil.mark_flushed(session)
+
+
+def _after_bulk_change(update_context):
+    """ Collect tables of query.update() and query.delete() """
+    CacheUtil.mark_changed(update_context.session, update_context.mapper.tables)
+
+
+def _invalidate(info):
+    """ Invalidate cached results for tables recorded in info """
+    tables = info.pop(CacheUtil.CHANGED_TABLES_KEY, None)
+    if tables and Model.cache is not None:
+        Model.cache.invalidate(tables)
+
+
+def _after_commit(session):
+    """ Invalidate cached results for committed tables """
+    _invalidate(session.info)
+
+
+def _after_transaction_end(session, transaction):
+    """ Discard changes of rolled back transaction """
+    if transaction.parent is None:
+        session.info.pop(CacheUtil.CHANGED_TABLES_KEY, None)
+
+
+def _after_execute(conn, clauseelement, multiparams, params, result):  # pylint: disable=unused-argument
+    """ Collect tables of core insert, update and delete statements """
+    if isinstance(clauseelement, UpdateBase):
+        if conn.in_transaction():
+            CacheUtil.mark_changed(conn, [clauseelement.table])
+        elif Model.cache is not None:  # statement was autocommitted
+            Model.cache.invalidate([clauseelement.table.fullname])
+
+
+def _commit(conn):
+    """ Invalidate cached results for tables committed on connection """
+    _invalidate(conn.info)
+
+
+def _rollback(conn):
+    """ Discard changes of rolled back connection transaction """
+    conn.info.pop(CacheUtil.CHANGED_TABLES_KEY, None)
+
+
+def _reset(dbapi_connection, connection_record):  # pylint: disable=unused-argument
+    """ Discard changes of connection returned to pool """
+    connection_record.info.pop(CacheUtil.CHANGED_TABLES_KEY, None)
+
+
+SESSION_EVENTS = {
+    'after_flush': _after_flush,
+    'after_bulk_update': _after_bulk_change,
+    'after_bulk_delete': _after_bulk_change,
+    'after_commit': _after_commit,
+    'after_transaction_end': _after_transaction_end
+}
+
+ENGINE_EVENTS = {
+    'after_execute': _after_execute,
+    'commit': _commit,
+    'rollback': _rollback,
+    'reset': _reset
+}
 
 
 class Painless():
 
-    def __init__(self, db_uri, engine_options=None, session_options=None):
+    def __init__(self, db_uri, engine_options=None, session_options=None,
+                 cache=None):
         if engine_options is None:
             engine_options = {}
         if session_options is None:
@@ -19,3 +90,22 @@ class Painless():
         Model.session = self.session
         Model.engine = self.engine
         self.Model = Model
+        self.set_cache(cache)
+
+    def set_cache(self, cache):
+        """
+            Configure result cache, None disables caching
+            - Invalidation hooks are only registered on sessions of
+            self.session and on self.engine while a cache is configured
+        """
+        Model.cache = cache
+        for target, events in [
+                (self.session.session_factory, SESSION_EVENTS),
+                (self.engine, ENGINE_EVENTS)
+        ]:
+            for name, fn in events.items():
+                listening = event.contains(target, name, fn)
+                if cache is not None and not listening:
+                    event.listen(target, name, fn)
+                elif cache is None and listening:
+                    event.remove(target, name, fn)
@@ -0,0 +1,83 @@
+import time
+import pickle
+import hashlib
+from abc import abstractmethod
+
+
+class AbstractCache():
+    """
+        Result cache invalidated per table
+        - Every table has a version that changes on invalidation
+        - Entries store the versions of the tables they were computed from
+        and are only returned while these versions are current
+    """
+
+    def __init__(self, ttl=None):
+        assert ttl is None or (isinstance(ttl, (int, float)) and ttl > 0)
+        self.ttl = ttl
+
+    @staticmethod
+    def get_key(*args):
+        """ Compute cache key from hashable representation """
+        return hashlib.sha256(repr(args).encode()).hexdigest()
+
+    @abstractmethod
+    def get_versions(self, tables):
+        """
+            Obtain current versions for tables
+            :param tables: sorted tuple of table names
+            :return: tuple of versions
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def invalidate(self, tables):
+        """
+            Invalidate all entries computed from any of the tables
+            :param tables: iterable of table names
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self):
+        """ Remove all entries """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _read(self, key):
+        """ Read raw entry for key, returns None if not present """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _write(self, key, data):
+        """ Write raw entry for key, evicting entries where necessary """
+        raise NotImplementedError()
+
+    def get(self, key, versions):
+        """
+            Obtain cached value
+            :param key: key as returned from get_key
+            :param versions: current table versions (see get_versions)
+            :return: copy of value or None if missing, stale or expired
+        """
+        data = self._read(key)
+        if data is None:
+            return None
+        entry_versions, expires, value = pickle.loads(data)
+        if entry_versions != versions:
+            return None
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+    def set(self, key, versions, value):
+        """
+            Store value
+            :param key: key as returned from get_key
+            :param versions: table versions obtained *before* value was
+            computed (see get_versions)
+            :param value: picklable value
+        """
+        expires = None if self.ttl is None else time.time() + self.ttl
+        self._write(key, pickle.dumps(
+            (versions, expires, value), pickle.HIGHEST_PROTOCOL))
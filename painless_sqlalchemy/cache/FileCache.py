@@ -0,0 +1,103 @@
+import os
+import uuid
+import tempfile
+from painless_sqlalchemy.cache.AbstractCache import AbstractCache
+
+
+class FileCache(AbstractCache):
+    """
+        LRU Cache shared between processes through local directory
+        - Use memory backed directory (e.g. /dev/shm) for best performance
+        - Table versions are random tokens, so concurrent invalidations
+        can not be lost
+        - Writes are atomic (rename)
+        - Entries are unpickled, so the directory must be trusted and only
+        writable by the application user (created with mode 0700)
+        - Size is tracked per process and the directory is only scanned
+        once max_size is exceeded. Eviction frees 10% of max_size, so it
+        runs at most every max_size / 10 writes
+    """
+
+    def __init__(self, directory, max_size=None, ttl=None):
+        super().__init__(ttl=ttl)
+        assert max_size is None or (isinstance(max_size, int) and max_size > 0)
+        self.max_size = max_size
+        self.entry_dir = os.path.join(directory, "entries")
+        self.version_dir = os.path.join(directory, "versions")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.makedirs(self.entry_dir, mode=0o700, exist_ok=True)
+        os.makedirs(self.version_dir, mode=0o700, exist_ok=True)
+        self._size = None  # entry count estimate, unknown until scanned
+
+    @staticmethod
+    def _write_atomic(path, data):
+        """ Write file so that readers never see partial content """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get_versions(self, tables):
+        result = []
+        for table in tables:
+            try:
+                with open(os.path.join(self.version_dir, table), "rb") as f:
+                    result.append(f.read())
+            except FileNotFoundError:
+                result.append(None)
+        return tuple(result)
+
+    def invalidate(self, tables):
+        for table in tables:
+            self._write_atomic(
+                os.path.join(self.version_dir, table), uuid.uuid4().bytes)
+
+    def clear(self):
+        for name in os.listdir(self.entry_dir):
+            try:
+                os.unlink(os.path.join(self.entry_dir, name))
+            except FileNotFoundError:
+                pass
+        self._size = 0
+
+    def _read(self, key):
+        path = os.path.join(self.entry_dir, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _evict(self):
+        """ Remove least recently used entries if max size is exceeded """
+        entries = []
+        for entry in os.scandir(self.entry_dir):
+            if not entry.name.startswith("."):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        if len(entries) > self.max_size:
+            entries.sort()
+            keep = self.max_size - self.max_size // 10
+            for _, path in entries[:len(entries) - keep]:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            entries = entries[len(entries) - keep:]
+        self._size = len(entries)
+
+    def _write(self, key, data):
+        self._write_atomic(os.path.join(self.entry_dir, key), data)
+        if self.max_size is not None:
+            if self._size is not None:
+                self._size += 1  # overestimates for replaced entries
+            if self._size is None or self._size > self.max_size:
+                self._evict()
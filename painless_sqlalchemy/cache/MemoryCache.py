@@ -0,0 +1,44 @@
+import itertools
+import threading
+from collections import OrderedDict
+from painless_sqlalchemy.cache.AbstractCache import AbstractCache
+
+
+class MemoryCache(AbstractCache):
+    """ In-process LRU Cache """
+
+    def __init__(self, max_size=1024, ttl=None):
+        super().__init__(ttl=ttl)
+        assert isinstance(max_size, int) and max_size > 0
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get_versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = next(self._counter)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _read(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _write(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
@@ -1,5 +1,6 @@
 from geoalchemy2 import Geometry
-from sqlalchemy import func
+from sqlalchemy import func, cast
+from sqlalchemy.dialects.postgresql import JSON
 from painless_sqlalchemy.columns.AbstractType import AbstractType
 
 
@@ -34,6 +35,9 @@ class AbstractGeometry(Geometry, AbstractType):
     def result_processor(self, dialect, coltype):
         raise NotImplementedError()
 
+    def json_expression(self, col):
+        return cast(func.ST_AsGeoJSON(col), JSON)['coordinates']
+
     def bind_processor(self, dialect):
         def process(bindvalue):
             if bindvalue is None:
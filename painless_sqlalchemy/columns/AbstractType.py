@@ -5,3 +5,7 @@ class AbstractType():
     @abstractmethod
     def validator(self, attr_name):
         raise NotImplementedError()
+
+    def json_expression(self, col):
+        """ SQL expression equivalent to result_processor (for JSON) """
+        return col
@@ -47,6 +47,9 @@ class AreaType(AbstractGeometry, AbstractType):
             return [(p[0], p[1]) for p in value['coordinates'][0]]
         return process
 
+    def json_expression(self, col):
+        return super().json_expression(col)[0]
+
     def validator(self, attr_name):
         def validate(target, value, oldvalue, initiator):  # pylint: disable=unused-argument
             if value is not None:
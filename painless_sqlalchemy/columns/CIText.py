@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.sql.sqltypes import Concatenable
 from sqlalchemy.sql.type_api import UserDefinedType
 from painless_sqlalchemy.columns.AbstractType import AbstractType
@@ -35,6 +36,9 @@ class CIText(Concatenable, UserDefinedType, AbstractType):
             return None if result is None else (result.lower() if self.force_lower else result)
         return process
 
+    def json_expression(self, col):
+        return func.lower(col) if self.force_lower else col
+
     def validator(self, attr_name):
         def validate(target, value, oldvalue, initiator):  # pylint: disable=unused-argument
             return True
@@ -1,5 +1,5 @@
 import re
-from sqlalchemy import Integer
+from sqlalchemy import Integer, func, literal
 from painless_sqlalchemy.columns.AbstractType import AbstractType
 
 HEX_COLOR_REGEX = re.compile(r'^#[0-9a-fA-F]{6}$')
@@ -18,6 +18,9 @@ class HexColorType(Integer, AbstractType):
             return None if bindvalue is None else int(bindvalue[1:], 16)
         return process
 
+    def json_expression(self, col):
+        return literal('#').concat(func.lpad(func.upper(func.to_hex(col)), 6, '0'))
+
     def validator(self, attr_name):
         def validate(target, value, oldvalue, initiator):  # pylint: disable=unused-argument
             if value is not None:
@@ -1,4 +1,5 @@
 import datetime as dt
+from sqlalchemy import func
 from sqlalchemy.sql.sqltypes import Time
 from painless_sqlalchemy.columns.AbstractType import AbstractType
 
@@ -16,6 +17,9 @@ class TimeType(Time, AbstractType):
             return None if bindvalue is None else dt.time(*map(int, bindvalue.split(":")), 0)
         return process
 
+    def json_expression(self, col):
+        return func.to_char(col, 'HH24:MI')
+
     def validator(self, attr_name):
         def validate(target, value, oldvalue, initiator):  # pylint: disable=unused-argument
             if value is not None:
@@ -1,4 +1,5 @@
-from sqlalchemy import String
+from sqlalchemy import String, case, literal, any_
+from sqlalchemy.dialects.postgresql import ARRAY
 from painless_sqlalchemy.columns.AbstractType import AbstractType
 
 VALID_TIMEZONES = [
@@ -175,6 +176,10 @@ class TimeZoneType(String, AbstractType):
             return bindvalue if bindvalue in VALID_TIMEZONES else None
         return process
 
+    def json_expression(self, col):
+        valid = literal(VALID_TIMEZONES, ARRAY(String))
+        return case([(col == any_(valid), col)], else_=None)
+
     def validator(self, attr_name):
         def validate(target, value, oldvalue, initiator):  # pylint: disable=unused-argument
             if value is not None:
@@ -1,6 +1,7 @@
-from painless_sqlalchemy.core.ModelSerialization import ModelSerialization
+from painless_sqlalchemy.core.ModelJsonSerialization import (
+    ModelJsonSerialization)
 
 
-class Model(ModelSerialization):
+class Model(ModelJsonSerialization):
 
     __abstract__ = True
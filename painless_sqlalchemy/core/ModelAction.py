@@ -1,6 +1,12 @@
-from sqlalchemy import inspect
+import json
+import itertools
+from sqlalchemy import (
+    inspect, select, func, cast, literal, and_, Column, Integer)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session, sessionmaker
+from painless_sqlalchemy.columns.AbstractType import AbstractType
 from painless_sqlalchemy.core.ModelValidation import ModelValidation
+from painless_sqlalchemy.util import CacheUtil, CopyUtil
 
 
 class ModelAction(ModelValidation):
@@ -64,3 +70,393 @@ class ModelAction(ModelValidation):
         """
         self._get_session().rollback()
         return self
+
+    @classmethod
+    def _get_table_columns(cls):
+        """
+            Get writable table columns (computed once per class)
+            :return dict mapping column attribute name to table column
+        """
+        if '_table_columns' not in cls.__dict__:
+            columns = {}
+            for key, prop in inspect(cls).column_attrs.items():
+                column = prop.columns[0]
+                if isinstance(column, Column) and column.table is cls.__table__:
+                    columns[key] = column
+            cls._table_columns = columns
+        return cls._table_columns
+
+    @classmethod
+    def _get_column_values(cls, values):
+        """
+            Validate values and map them to table columns
+            :param values: dict mapping column attribute names to values
+            :return dict mapping table column keys to values
+        """
+        columns = cls._get_table_columns()
+        for key in values:
+            if key not in columns:
+                raise AttributeError("Key \"%s\" is not a valid column." % key)
+        cls.validate(values)
+        return {columns[key].key: value for key, value in values.items()}
+
+    @classmethod
+    def _commit_table_changes(cls, session, tables=()):
+        """
+            Commit changes made to model table bypassing the ORM
+            - Marks table as changed, so cached results are invalidated
+            (only tracked while a cache is configured)
+            :param tables: additional changed tables (e.g. cascades)
+        """
+        if cls.cache is not None:
+            CacheUtil.mark_changed(session, [cls.__table__] + list(tables))
+        session.commit()
+
+    @classmethod
+    def _get_batches(cls, rows, batch_size, unique=None):
+        """
+            Validate rows and split them into batches for multi-row statements
+            - Rows in a batch have identical keys
+            - Without unique, rows are grouped by keys across input
+            - With unique, input order is kept and rows in a batch have
+            distinct values for the unique columns
+            :param rows: iterable of dicts mapping column names to values
+            :param batch_size: maximum amount of rows per batch
+            :param unique: tuple of column names required in every row
+            :return tuple(amount of rows, list of batches), where batches
+            are lists of tuple(row index, values by table column key)
+        """
+        groups, batches, count = {}, [], 0
+        seen = set()
+        for index, row in enumerate(rows):
+            count += 1
+            values = cls._get_column_values(row)
+            keys = tuple(sorted(values))
+            if unique is None:
+                groups.setdefault(keys, []).append((index, values))
+                continue
+            if not set(unique) <= set(row):
+                raise ValueError("Row is missing unique columns %s." % (unique,))
+            ident = tuple(row[k] for k in unique)
+            if None in ident:
+                raise ValueError(
+                    "Row has None for unique columns %s." % (unique,))
+            if (
+                    not batches or len(batches[-1]) == batch_size or
+                    tuple(sorted(batches[-1][0][1])) != keys or ident in seen
+            ):
+                batches.append([])
+                seen = set()
+            batches[-1].append((index, values))
+            seen.add(ident)
+        for keys, group in groups.items():
+            size = batch_size if keys else 1
+            batches += [
+                group[i:i + size] for i in range(0, len(group), size)]
+        return count, batches
+
+    @classmethod
+    def _allocate_ids(cls, session, count):
+        """
+            Obtain new ids from the id column sequence
+            :param session: session to use
+            :param count: amount of ids to allocate
+            :return list of ids or None if id column has no sequence
+        """
+        table = cls.__table__
+        id_column = cls.id.property.columns[0]
+        preparer = session.connection().dialect.identifier_preparer
+        sequence = session.execute(select([func.pg_get_serial_sequence(
+            preparer.format_table(table), id_column.name)])).scalar()
+        if sequence is None:
+            return None
+        return [row[0] for row in session.execute(
+            select([func.nextval(sequence)]).select_from(
+                func.generate_series(1, count)))]
+
+    @classmethod
+    def bulk_create(cls, rows, return_ids=False, batch_size=1000,
+                    session=None):
+        """
+            Insert rows without instantiating models
+            - Values are validated using custom column type validators
+            - Rows with identical keys are inserted using multi-row inserts
+            - All rows are inserted in one transaction, which is committed
+            - For return_ids, ids are allocated from the id sequence before
+            inserting (RETURNING does not guarantee order). Without sequence
+            rows are inserted one by one
+            :param rows: iterable of dicts mapping column names to values
+            :param return_ids: Whether to return ids of inserted rows
+            :param batch_size: maximum amount of rows per insert statement
+            :param session: Explicit session to use, defaults to model session
+            :return list of ids in order of rows if return_ids is set,
+            otherwise amount of inserted rows
+        """
+        assert isinstance(batch_size, int) and batch_size > 0
+        if session is None:
+            session = cls.session
+
+        count, batches = cls._get_batches(rows, batch_size)
+        ids = [None] * count
+        table = cls.__table__
+        id_column = cls.id.property.columns[0]
+        for batch in batches:
+            if return_ids and id_column.key not in batch[0][1]:
+                allocated = None
+                if len(batch) > 1:
+                    allocated = cls._allocate_ids(session, len(batch))
+                if allocated is None:
+                    for index, values in batch:
+                        statement = table.insert()
+                        if values:
+                            statement = statement.values(values)
+                        ids[index] = session.execute(
+                            statement.returning(id_column)).scalar()
+                    continue
+                for (_, values), id_ in zip(batch, allocated):
+                    values[id_column.key] = id_
+            if return_ids:
+                for index, values in batch:
+                    ids[index] = values[id_column.key]
+            if batch[0][1]:
+                statement = table.insert().values([v for _, v in batch])
+            else:  # default values can not be inserted as multi-row
+                statement = table.insert()
+            session.execute(statement)
+        cls._commit_table_changes(session)
+        return ids if return_ids else count
+
+    @classmethod
+    def _decode_csv_values(cls, row):
+        """
+            Decode csv values of custom column types
+            - Location and Area values are expected as json arrays
+            :param row: dict mapping column names to strings or None
+            :return dict mapping column names to values
+        """
+        columns = cls._get_table_columns()
+        result = {}
+        for key, value in row.items():
+            type_ = getattr(columns.get(key), 'type', None)
+            if (
+                    value is not None and isinstance(type_, AbstractType) and
+                    type_.python_type in (tuple, list)
+            ):
+                try:
+                    value = type_.python_type(json.loads(value))
+                except ValueError:
+                    pass  # invalid json is rejected by validator
+            result[key] = value
+        return result
+
+    @classmethod
+    def copy_from(cls, source, session=None,
+                  buffer_size=CopyUtil.COPY_BUFFER_SIZE):
+        """
+            Stream rows into table using COPY FROM STDIN
+            - Values are validated and encoded by the column types like
+            values assigned to models (bind_processor)
+            - Rows are encoded while being streamed (bounded memory)
+            - All rows need to have the same keys
+            - Rows are copied in one transaction, which is committed
+            (rolled back on error)
+            :param source: iterable of dicts mapping column names to values
+            or readable csv file with header. For csv, empty fields are
+            considered None and Location / Area values json arrays
+            :param session: Explicit session to use, defaults to model session
+            :param buffer_size: amount of characters sent per chunk
+            :return amount of copied rows
+        """
+        assert isinstance(buffer_size, int) and buffer_size > 0
+        if session is None:
+            session = cls.session
+        rows = iter(source)
+        if hasattr(source, 'read'):
+            rows = (cls._decode_csv_values(r) for r in CopyUtil.read_csv(source))
+        first = next(rows, None)
+        if first is None:
+            return 0
+        keys = set(first)
+        values = cls._get_column_values(first)
+
+        connection = session.connection()
+        dialect = connection.dialect
+        table = cls.__table__
+        columns = [table.c[k] for k in values]
+        processors = [c.type.bind_processor(dialect) for c in columns]
+
+        def encode_row(row):
+            if row.keys() != keys:
+                raise ValueError("Row keys differ from first row keys.")
+            values = cls._get_column_values(row)
+            return [
+                CopyUtil.encode_value(
+                    values[c.key] if p is None else p(values[c.key]))
+                for c, p in zip(columns, processors)
+            ]
+
+        preparer = dialect.identifier_preparer
+        statement = "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (
+            preparer.format_table(table),
+            ", ".join(preparer.format_column(c) for c in columns)
+        )
+        stream = CopyUtil.CopyStream(
+            itertools.chain([first], rows), encode_row)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(statement, stream, size=buffer_size)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            cursor.close()
+        cls._commit_table_changes(session)
+        return stream.count
+
+    @classmethod
+    def upsert(cls, rows, conflict=('id',), update=None, batch_size=1000,
+               session=None):
+        """
+            Insert rows or update them if they already exist
+            - Uses multi-row INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+            - Returned ids are matched to rows by conflict values, which
+            can not be None
+            - Values are validated using custom column type validators
+            - Rows are applied in order, rows with same conflict values are
+            never part of the same statement
+            - All rows are upserted in one transaction, which is committed
+            :param rows: iterable of dicts mapping column names to values
+            :param conflict: column names of unique index that identifies
+            existing rows, required in every row
+            :param update: column names updated for existing rows, defaults
+            to all given columns except conflict columns
+            :param batch_size: maximum amount of rows per statement
+            :param session: Explicit session to use, defaults to model session
+            :return list of ids (inserted or updated) in order of rows
+        """
+        assert isinstance(batch_size, int) and batch_size > 0
+        assert isinstance(conflict, tuple) and len(conflict) > 0
+        assert update is None or isinstance(update, tuple)
+        if session is None:
+            session = cls.session
+        columns = cls._get_table_columns()
+        for key in conflict + (update or ()):
+            if key not in columns:
+                raise AttributeError("Key \"%s\" is not a valid column." % key)
+
+        count, batches = cls._get_batches(rows, batch_size, unique=conflict)
+        ids = [None] * count
+        table = cls.__table__
+        id_column = cls.id.property.columns[0]
+        index_elements = [columns[k] for k in conflict]
+        for batch in batches:
+            keys = batch[0][1].keys()
+            statement = insert(table).values([v for _, v in batch])
+            if update is None:
+                set_ = [c for c in table.c if c.key in keys]
+                set_ = [c for c in set_ if c not in index_elements]
+            else:
+                set_ = [columns[k] for k in update if columns[k].key in keys]
+            if not set_:  # update required to return id of existing row
+                set_ = index_elements[:1]
+            upserted = statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={c.key: statement.excluded[c.key] for c in set_}
+            ).returning(id_column, *[
+                c for c in index_elements if c is not id_column
+            ]).cte("upserted")
+            # Note: RETURNING does not guarantee order, so returned rows are
+            # matched to input positions by conflict values (unique in batch)
+            arrays = [(list(range(len(batch))), Integer())] + [
+                ([v[c.key] for _, v in batch], c.type) for c in index_elements]
+            given = select([
+                func.unnest(cast(literal(a, ARRAY(t)), ARRAY(t)))
+                .label("c%d" % i) for i, (a, t) in enumerate(arrays)
+            ]).alias("given")
+            matched = select([given.c.c0, upserted.c[id_column.name]])
+            matched = matched.select_from(
+                given.join(upserted, and_(*[
+                    given.c["c%d" % i] == upserted.c[c.name]
+                    for i, c in enumerate(index_elements, 1)
+                ])))
+            for position, id_ in session.execute(matched):
+                ids[batch[position][0]] = id_
+        cls._commit_table_changes(session)
+        return ids
+
+    @classmethod
+    def _get_where_clause(cls, filter_by, session, allow_all):
+        """
+            Build where clause selecting filtered rows of model table
+            - *_to_many relationships are filtered using EXISTS
+            - Filters requiring joins are applied as subquery of ids
+            (UPDATE ... FROM / DELETE ... USING)
+            :param filter_by: see ModelFilter.filter
+            :param session: Explicit session to use or None
+            :param allow_all: Allow empty filter matching all rows
+            :return SQLAlchemy clause or None (all rows)
+        """
+        query = cls.query if session is None else session.query(cls)
+        if filter_by is not None:
+            # pylint: disable=E1101
+            query = cls.filter(filter_by, query, strategy='exists')
+        if not getattr(query, '__joins', None):
+            if query.whereclause is None and not allow_all:
+                raise ValueError(
+                    "Empty filter matches all rows, pass allow_all=True.")
+            return query.whereclause
+        id_column = cls.id.property.columns[0]
+        ids = query.with_entities(id_column.label("id")).subquery("filtered")
+        return id_column == ids.c.id
+
+    @classmethod
+    def update_where(cls, filter_by, values, session=None, allow_all=False):
+        """
+            Update all rows matching filter using a single UPDATE statement
+            - Values are validated using custom column type validators
+            - Loaded objects are not synchronized, reload them if needed
+            - Changes are committed
+            :param filter_by: see ModelFilter.filter
+            :param values: dict mapping column names to values
+            :param session: Explicit session to use, defaults to model session
+            :param allow_all: Update all rows if filter is empty, otherwise
+            empty filters raise ValueError
+            :return amount of updated rows
+        """
+        assert isinstance(values, dict) and len(values) > 0
+        if session is None:
+            session = cls.session
+        values = cls._get_column_values(values)
+        statement = cls.__table__.update().values(values)
+        where = cls._get_where_clause(filter_by, session, allow_all)
+        if where is not None:
+            statement = statement.where(where)
+        result = session.execute(statement)
+        cls._commit_table_changes(session)
+        return result.rowcount
+
+    @classmethod
+    def delete_where(cls, filter_by, session=None, allow_all=False):
+        """
+            Delete all rows matching filter using a single DELETE statement
+            - Loaded objects are not synchronized, expunge them if needed
+            - Changes are committed
+            :param filter_by: see ModelFilter.filter
+            :param session: Explicit session to use, defaults to model session
+            :param allow_all: Delete all rows if filter is empty, otherwise
+            empty filters raise ValueError
+            :return amount of deleted rows
+        """
+        if session is None:
+            session = cls.session
+        statement = cls.__table__.delete()
+        where = cls._get_where_clause(filter_by, session, allow_all)
+        if where is not None:
+            statement = statement.where(where)
+        result = session.execute(statement)
+        # Note: association rows might be removed by cascades
+        cls._commit_table_changes(session, [
+            r.secondary for r in inspect(cls).relationships
+            if r.secondary is not None
+        ])
+        return result.rowcount
@@ -0,0 +1,63 @@
+from sqlalchemy import inspect
+from sqlalchemy.sql.util import find_tables
+from painless_sqlalchemy.core.ModelPagination import ModelPagination
+from painless_sqlalchemy.util import CacheUtil
+
+
+class ModelCache(ModelPagination):
+    """ Cached Serialization Logic """
+
+    __abstract__ = True
+
+    @classmethod
+    def _as_cached_list(cls, query, plan):
+        """
+            Serialize query results using result cache where possible
+            - Key is computed from compiled query, parameters and fields
+            - Entries are invalidated when any involved table is committed
+            (ORM flushes, bulk query updates and core insert, update and
+            delete statements)
+            - Not used when session contains uncommitted changes or is not
+            created by Painless.session (no invalidation hooks)
+            :param query: query to serialize
+            :param plan: serialization plan used to build query
+            :return list of serialized query results
+        """
+        session = query.session
+        if not isinstance(session, cls.session.session_factory.class_) or \
+                CacheUtil.has_changes(session, mapper=inspect(cls)):
+            return cls._as_list(query, plan)
+
+        statement = query.statement
+        compiled = statement.compile(
+            dialect=session.get_bind(mapper=inspect(cls)).dialect)
+        tables = tuple(sorted(plan.tables | set(
+            t.fullname for t in find_tables(statement))))
+        # pylint: disable-msg=W0212
+        key = cls.cache.get_key(
+            str(compiled), sorted(compiled.params.items()),
+            sorted(query._params.items()), sorted(plan.fields))
+
+        # obtain versions first, so concurrent commits invalidate result
+        versions = cls.cache.get_versions(tables)
+        result = cls.cache.get(key, versions)
+        if result is None:
+            result = cls._as_list(query, plan)
+            cls.cache.set(key, versions, result)
+        return result
+
+    @classmethod
+    def serialize(cls, *args, cached=True, **kwargs):
+        """
+                Convert to serializable representation
+            :param args: See _ser for details
+            :param cached: Use result cache (if configured). Changes made
+            through raw SQL (strings or text()) are not tracked and require
+            Model.cache.invalidate(tables)
+            :param kwargs: See _ser for details
+            :return: Json serializable representation
+        """
+        if cached is True and cls.cache is not None:
+            cls._check_ser_kwargs(kwargs)
+            return cls._as_cached_list(*cls._ser(*args, **kwargs))
+        return super(ModelCache, cls).serialize(*args, **kwargs)
@@ -0,0 +1,128 @@
+import functools
+from types import SimpleNamespace
+from collections import namedtuple
+from sqlalchemy import inspect, orm, select
+from sqlalchemy.orm import aliased
+from painless_sqlalchemy.core.ModelCache import ModelCache
+from painless_sqlalchemy.core.ModelSerialization import PLAN_CACHE_SIZE
+
+# Relationship path node used for Core-level serialization
+# - parent: index of parent node (None for root)
+# - key: relationship name on parent (None for root)
+# - alias: aliased model class
+# - uselist: True iff *_to_many relationship
+# - columns: attribute keys to select, starting with primary keys
+# - pk_count: amount of primary key columns
+# - relationships: tuple of (key, uselist) for child nodes
+CoreNode = namedtuple('CoreNode', [
+    'parent', 'key', 'alias', 'uselist', 'columns', 'pk_count',
+    'relationships'
+])
+
+
+class ModelCoreSerialization(ModelCache):
+    """ Core-level Serialization Logic """
+
+    __abstract__ = True
+
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _get_core_nodes(cls, to_fetch):
+        """
+                Compile relationship tree for Core-level serialization
+            :param to_fetch: tuple of columns to fetch (dot notation)
+            :return: tuple of CoreNode, parents before children
+        """
+        paths = {(): set()}
+        for field in to_fetch:
+            path = tuple(field.split("."))
+            for i in range(1, len(path)):
+                paths.setdefault(path[:i], set())
+            paths[path[:-1]].add(path[-1])
+
+        nodes, index = [], {}
+        for path in sorted(paths, key=lambda p: (len(p), p)):
+            if path:
+                parent = index[path[:-1]]
+                prop = getattr(nodes[parent].alias, path[-1]).property
+                class_, uselist = prop.mapper.class_, prop.uselist
+            else:
+                parent, class_, uselist = None, cls, False
+            mapper = inspect(class_)
+            pks = [mapper.get_property_by_column(c).key for c in mapper.primary_key]
+            index[path] = len(nodes)
+            nodes.append(CoreNode(
+                parent=parent,
+                key=path[-1] if path else None,
+                alias=aliased(class_),
+                uselist=uselist,
+                columns=tuple(pks + sorted(paths[path] - set(pks))),
+                pk_count=len(pks),
+                relationships=None
+            ))
+        return tuple(node._replace(relationships=tuple(
+            (n.key, n.uselist) for n in nodes if n.parent == i
+        )) for i, node in enumerate(nodes))
+
+    @classmethod
+    def serialize_core(cls, *args, **kwargs):
+        """
+                Convert to serializable representation bypassing the ORM
+                - Selects required columns with single Core select
+                - Nested results are assembled from result tuples, grouped
+                by primary key (no model instances are created)
+            :param args: See _ser for details
+            :param kwargs: See _ser for details
+            :return: Json serializable representation
+        """
+        cls._check_ser_kwargs(kwargs)
+        page, plan = cls._ser(*args, core=True, **kwargs)
+        session = page.session
+        page = page.subquery("page")
+        nodes = cls._get_core_nodes(plan.to_fetch)
+
+        # join relationships and select columns
+        joined = orm.join(page, nodes[0].alias, page.c.id == nodes[0].alias.id)
+        columns, order_by, offsets = [page.c.dense_rank], [page.c.dense_rank], []
+        for node in nodes:
+            if node.parent is not None:
+                parent = nodes[node.parent].alias
+                joined = orm.outerjoin(
+                    joined, node.alias, getattr(parent, node.key))
+                order_by += [
+                    getattr(node.alias, c) for c in node.columns[:node.pk_count]]
+            offsets.append(len(columns))
+            columns += [getattr(node.alias, c) for c in node.columns]
+        statement = select(columns, use_labels=True).select_from(
+            joined).order_by(*order_by)
+        rows = session.execute(statement, kwargs.get('params') or {})
+
+        # assemble nested results grouped by primary keys
+        seen, results = {}, []
+        for row in rows:
+            idents = []
+            for node, offset in zip(nodes, offsets):
+                parent = None if node.parent is None else idents[node.parent]
+                pk = tuple(row[offset:offset + node.pk_count])
+                if (
+                    (node.parent is not None and parent is None) or
+                    all(v is None for v in pk)
+                ):
+                    idents.append(None)
+                    continue
+                ident = (parent, node.key, pk)
+                if ident not in seen:
+                    state = SimpleNamespace(**dict(zip(
+                        node.columns, row[offset:offset + len(node.columns)])))
+                    for key, uselist in node.relationships:
+                        setattr(state, key, [] if uselist else None)
+                    seen[ident] = state
+                    if parent is None:
+                        results.append(state)
+                    elif node.uselist:
+                        getattr(seen[parent], node.key).append(state)
+                    else:
+                        setattr(seen[parent], node.key, state)
+                idents.append(ident)
+        build = plan.builder
+        return [build(state) for state in results]
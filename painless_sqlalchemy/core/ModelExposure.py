@@ -0,0 +1,122 @@
+import functools
+from sqlalchemy import event, inspect, orm
+from sqlalchemy.orm import RelationshipProperty
+from painless_sqlalchemy.core.ModelFilter import ModelFilter
+from painless_sqlalchemy.elements.MapColumn import MapColumn
+from painless_sqlalchemy.util import DictUtil
+
+# maximum amount of field exposure checks kept in memory
+FIELD_CACHE_SIZE = 8192
+
+
+class ModelExposure(ModelFilter):
+    """ Column Exposure Logic """
+
+    __abstract__ = True
+
+    @classmethod
+    def _get_column_exposure(cls, field):
+        """
+            Check field is exposed, i.e.
+            - not exposed columns
+            - column referencing not exposed columns
+            - exposure is specified explicitly in "exposed" info dict
+            - exposure default to false iff column is primary key
+            :return True iff column is exposed
+        """
+        path = field.split(".")
+        cols = cls._get_column(path)
+        if not isinstance(cols, list):
+            cols = [cols]
+        for col in cols:
+            # check for foreign key id reference that is not exposed
+            for fk in getattr(col, 'foreign_keys', set()):
+                is_primary_key = fk.column.primary_key
+                fk_table = fk.column.table.name
+                assert fk_table.quote is None
+                if not fk.column.info.get("exposed", not is_primary_key):
+                    return False
+
+            # check if exposed
+            if not col.info.get("exposed", not col.primary_key):
+                assert col.class_.__table__.name.quote is None
+                return False
+
+        # this field can be exposed
+        return True
+
+    @classmethod
+    def _build_exposure_index(cls):
+        """
+            Compute exposure of all columns and MapColumn targets of model
+            - Relationships are not followed, see _is_exposed_column
+            :return dict mapping field (dot notation) to exposure
+        """
+        keys = inspect(cls).column_attrs.keys()
+        for base in cls.__mro__:
+            for key, value in vars(base).items():
+                if isinstance(value, MapColumn) and getattr(cls, key) is value:
+                    if None in value:
+                        keys.append(key)
+                    else:
+                        keys += [
+                            "%s.%s" % (key, f)
+                            for f in DictUtil.flatten_dict(value)
+                        ]
+        result = {}
+        for key in set(keys):
+            try:
+                result[key] = cls._get_column_exposure(key)
+            except (AttributeError, KeyError, AssertionError):
+                pass  # invalid definition, error raised when used
+        return result
+
+    @classmethod
+    def _get_exposure_index(cls):
+        """
+            Obtain exposure index of model (built on mapper configuration)
+            :return dict mapping field (dot notation) to exposure
+        """
+        index = cls.__dict__.get('_exposure_index')
+        if index is None:
+            index = cls._build_exposure_index()
+            cls._exposure_index = index
+        return index
+
+    @classmethod
+    @functools.lru_cache(maxsize=FIELD_CACHE_SIZE)
+    def _is_exposed_column(cls, field):
+        """
+            Check field is exposed (see _get_column_exposure)
+            - Relationships are followed and exposure of the final
+            column is looked up in the exposure index of the target model
+            - Result is cached per model and field
+            :return True iff column is exposed
+        """
+        path = field.split(".")
+        class_ = cls
+        while len(path) > 1:
+            prop = getattr(getattr(class_, path[0], None), 'property', None)
+            if not isinstance(prop, RelationshipProperty):
+                break
+            class_, path = prop.mapper.class_, path[1:]
+        # pylint: disable-msg=W0212
+        exposed = class_._get_exposure_index().get(".".join(path))
+        if exposed is None:  # unknown field, resolve to raise error
+            return cls._get_column_exposure(field)
+        return exposed
+
+
+def build_exposure_indices():
+    """ Build exposure index for all configured models """
+    pending = [ModelExposure]
+    while pending:
+        class_ = pending.pop()
+        pending += class_.__subclasses__()
+        if '_sa_class_manager' in class_.__dict__:
+            # pylint: disable-msg=W0212
+            class_._get_exposure_index()
+
+
+# precompute exposure once all mappers are configured
+event.listen(orm.mapper, 'after_configured', build_exposure_indices)
@@ -1,8 +1,12 @@
-from sqlalchemy import func, sql, distinct, case
-from sqlalchemy.orm import aliased, RelationshipProperty
+import functools
+from sqlalchemy import (
+    func, sql, distinct, case, cast, literal, select, any_, and_, or_)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased, Query, RelationshipProperty
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.sql.annotation import Annotated
 from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.sqltypes import NullType
 from sqlalchemy.sql.selectable import FromGrouping, Select
 from sqlalchemy.sql.elements import (
     Label, BooleanClauseList, BinaryExpression, BindParameter, ColumnClause,
@@ -12,6 +16,16 @@ from sqlalchemy.util import NoneType
 from painless_sqlalchemy.core.ModelAction import ModelAction
 from painless_sqlalchemy.elements.MapColumn import MapColumn
 from painless_sqlalchemy.elements.ColumnReference import ColumnReference
+from painless_sqlalchemy.elements.FilterTemplate import FilterTemplate
+from painless_sqlalchemy.elements.FilterOperator import FilterOperator
+
+# maximum amount of resolved paths kept in memory (per method)
+PATH_CACHE_SIZE = 4096
+
+# strategies for filtering *_to_many relationships by dict
+# - join: outer join relationships (group by and having for lists)
+# - exists: correlated EXISTS subquery per value (one row per model)
+FILTER_STRATEGIES = ('join', 'exists')
 
 
 class ModelFilter(ModelAction):
@@ -19,16 +33,31 @@ class ModelFilter(ModelAction):
 
     __abstract__ = True
 
+    # default strategy for *_to_many dict filters, see FILTER_STRATEGIES
+    filter_strategy = 'join'
+
+    # list filter values of at least this length are sent as single
+    # array parameter (= ANY(array)) instead of one parameter per value
+    array_filter_threshold = 64
+    # list filter values of at least this length are semi-joined as
+    # unnested array (IN (SELECT unnest(array)))
+    unnest_filter_threshold = 4096
+
     @classmethod
-    def _iterate_path(cls, path):
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def _get_path_graph(cls, path):
         """
-            Iterate over relationship path
+            Resolve relationship path (cached)
             - For MapColumn the final column is string or list
-            :return generator (
+            - Relationship metadata (target, uselist, local_remote_pairs, ...)
+            is available as relationship column property
+            :param path: tuple of attributes
+            :return tuple (
                 (current class, relationship column, bool last iteration),
                 ..., (final class, final column, bool last iteration)
             )
         """
+        result = []
         class_ = cls  # hold last class
         cur = cls
         for attr in path:
@@ -40,9 +69,22 @@ class ModelFilter(ModelAction):
                 cur = getattr(cur, attr)
             property_ = getattr(cur, 'property', None)
             if isinstance(property_, RelationshipProperty):
-                yield class_, cur, False
+                result.append((class_, cur, False))
                 cur = property_.mapper.class_
-        yield class_, cur, True
+        result.append((class_, cur, True))
+        return tuple(result)
+
+    @classmethod
+    def _iterate_path(cls, path):
+        """
+            Iterate over relationship path
+            - For MapColumn the final column is string or list
+            :return iterable (
+                (current class, relationship column, bool last iteration),
+                ..., (final class, final column, bool last iteration)
+            )
+        """
+        return cls._get_path_graph(tuple(path))
 
     @classmethod
     def _get_column(cls, path):
@@ -52,6 +94,16 @@ class ModelFilter(ModelAction):
             - Can return list of columns for MapColumn
             :return column or list of columns
         """
+        cur = cls._resolve_column(tuple(path))
+        return list(cur) if isinstance(cur, list) else cur
+
+    @classmethod
+    @functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+    def _resolve_column(cls, path):
+        """
+            Resolve column for path tuple (cached), see _get_column
+            :return column or list of columns
+        """
         # get last element from iterator
         class_, cur = next(
             (class_, cur) for class_, cur, last in
@@ -78,26 +130,37 @@ class ModelFilter(ModelAction):
         """
             Join path relationships to query
             - Ensures that the join exist or create it
-            - Information about existing joins stored in "__aliases"
+            - Information about existing joins stored in "__aliases" and
+            applied joins in "__joins"
             - Creates unique join if there is *_to_many relationship and "and"
             is used. Relies on "and_info" meta
+            - Marks query in "__to_many" if *_to_many relationship is joined
             Note: query attributes persist across .join, .filter, etc
             :return (modified query, final alias.column)
         """
         # known joined aliases for this query
         joined_aliases = getattr(query, '__aliases', {})
         setattr(query, '__aliases', joined_aliases)
+        joins = getattr(query, '__joins', [])
+        setattr(query, '__joins', joins)
 
         # prep data
         alias = cls  # current alias for the joined model
         alias_name = "alias"
         unique_join = False  # true if the join is already unique
 
+        # *_to_many information from relationship graph
+        to_many = [
+            col.property.uselist for _, col, last in
+            cls._iterate_path(path[:-1]) if not last
+        ]
+        assert len(to_many) == len(path) - 1, path
+
         # iterate over path and join classes when necessary
-        for attr in path[:-1]:
+        for attr, uselist in zip(path[:-1], to_many):
             alias_name += "." + attr
             rel = getattr(alias, attr)
-            if not unique_join and rel.property.uselist:
+            if not unique_join and uselist:
                 # make join unique if and_ used since *_to_many
                 and_info = getattr(query, 'and_info')
                 # create and join the "and_" hierarchy
@@ -110,9 +173,13 @@ class ModelFilter(ModelAction):
                 alias = aliased(rel, name=alias_name)
                 query = query.outerjoin(alias, rel)
                 joined_aliases[alias_name] = alias
+                joins.append((alias_name, alias, rel))
             else:
                 alias = joined_aliases[alias_name]
 
+        if unique_join:  # results are no longer unique per model
+            setattr(query, '__to_many', True)
+
         return query, getattr(alias, path[-1])
 
     @classmethod
@@ -136,11 +203,14 @@ class ModelFilter(ModelAction):
             - Missing joins for clause are applied to data["query"]
             - Entries in clause are recursively resolved
             - Easy notation expected as "is_custom=true"-ColumnClause
+            - Passed clause is not modified (altered elements are copied)
             :return substituted clause
         """
+        # pylint: disable-msg=W0212
         and_info = cls._get_and_info(data['query'])
         if isinstance(clause, BooleanClauseList):
             assert clause.operator.__name__ in ('or_', 'and_')
+            clause = clause._clone()
             if clause.operator.__name__ == 'or_':
                 clause.clauses = [
                     cls._substitute_clause(data, c)
@@ -158,15 +228,20 @@ class ModelFilter(ModelAction):
                 and_info['depth'] -= 1
             return clause
         if isinstance(clause, Annotated):
-            clause.proxy_set = set(cls._substitute_clause(data, c) for c in clause.proxy_set)
+            proxy_set = set(cls._substitute_clause(data, c) for c in clause.proxy_set)
+            if proxy_set != clause.proxy_set:
+                clause = clause._clone()
+                clause.proxy_set = proxy_set
             return clause
         if isinstance(clause, ClauseList):
+            clause = clause._clone()
             clause.clauses = [
                 cls._substitute_clause(data, c)
                 for c in clause.clauses
             ]
             return clause
         if isinstance(clause, Case):
+            clause = clause._clone()
             clause.value = cls._substitute_clause(data, clause.value)
             clause.whens = [(
                 cls._substitute_clause(data, x),
@@ -177,22 +252,31 @@ class ModelFilter(ModelAction):
         if isinstance(clause, (
             Grouping, UnaryExpression, FromGrouping, Label
         )):
+            clause = clause._clone()
             clause.element = cls._substitute_clause(data, clause.element)
             return clause
         if isinstance(clause, FunctionElement):
-            # pylint: disable-msg=W0212
             return getattr(func, clause.name)(*[
                 cls._substitute_clause(data, c)
                 for c in clause.clause_expr.element
             ])
         if isinstance(clause, Select):
-            # pylint: disable-msg=W0212
+            clause = clause._generate()
             clause._raw_columns = [
                 cls._substitute_clause(data, c) for c in clause._raw_columns]
             return clause
         if isinstance(clause, BinaryExpression):
+            clause = clause._clone()
+            reference = isinstance(clause.left, ColumnReference)
             clause.left = cls._substitute_clause(data, clause.left)
             clause.right = cls._substitute_clause(data, clause.right)
+            # type untyped parameter (e.g. bindparam) using resolved column
+            if (
+                    reference and isinstance(clause.right, BindParameter) and
+                    clause.right.type._isnull
+            ):
+                clause.right = clause.right._clone()
+                clause.right.type = clause.left.type
             return clause
         if isinstance(clause, tuple):
             return tuple(cls._substitute_clause(data, c) for c in clause)
@@ -209,6 +293,7 @@ class ModelFilter(ModelAction):
         if not isinstance(clause, Cast):  # pragma: no cover
             print(type(clause), clause)
             raise NotImplementedError
+        clause = clause._clone()
         clause.clause = cls._substitute_clause(data, clause.clause)
         return clause
 
@@ -219,17 +304,126 @@ class ModelFilter(ModelAction):
             - Does not resolve MapColumn
         :return: True iff "*_to_many_" relationship
         """
-        rel = cls
         # Note: No need to consider the last relationship, since this
         # is always a class attribute (and hence a *_to_one relationship)
-        for attr in path[:-1]:
-            rel = getattr(aliased(rel), attr)
+        return any(
+            col.property.uselist for _, col, last in
+            cls._iterate_path(path[:-1]) if not last
+        )
+
+    @classmethod
+    def _get_in_clause(cls, column, values):
+        """
+            Build clause checking that column is contained in values
+            - Long lists are passed as single (typed) array parameter
+            - Very long lists are unnested and semi-joined
+            - See array_filter_threshold and unnest_filter_threshold
+        :param column: column to check
+        :param values: list of values
+        :return: clause
+        """
+        # arrays require type, which is unknown for some expressions
+        if (
+                len(values) < cls.array_filter_threshold or
+                isinstance(column.type, NullType)
+        ):
+            return column.in_(values)
+        # explicit cast, so e.g. citext keeps case insensitive comparison
+        array = cast(literal(values, ARRAY(column.type)), ARRAY(column.type))
+        if len(values) < cls.unnest_filter_threshold:
+            return column == any_(array)
+        return column.in_(select([func.unnest(array)]))
+
+    @classmethod
+    def _get_value_clause(cls, column, value):
+        """
+            Build clause comparing column to single dict filter value
+        :param column: column to compare
+        :param value: value or FilterOperator
+        :return: clause
+        """
+        if isinstance(value, FilterOperator):
+            return value.clause(column)
+        return column == value
+
+    @classmethod
+    def _get_exists_clause(cls, path, value):
+        """
+            Build correlated EXISTS clause for relationship path
+            - Nested relationships are chained using any() and has()
+            - Relationship targets are aliased, so that paths can
+            revisit tables
+        :param path: relationship path ending in column
+        :param value: value the final column is compared to
+        :return: clause
+        """
+        def build(parent, keys):
+            rel = getattr(parent, keys[0])
+            target = aliased(rel.property.mapper.class_)
+            if len(keys) == 1:
+                criterion = cls._get_value_clause(
+                    getattr(target, path[-1]), value)
+            else:
+                criterion = build(target, keys[1:])
             if rel.property.uselist:
-                return True
-        return False
+                return rel.of_type(target).any(criterion)
+            return rel.of_type(target).has(criterion)
+        return build(cls, path[:-1])
+
+    @classmethod
+    def filter_template(cls, clause):
+        """
+            Compile SQLAlchemy filter into reusable template
+            - Relationship paths (ref) are resolved once
+            - Use bindparam for values and pass them as query params
+            - The passed clause is not modified
+        :param clause: SQLAlchemy filter
+        :return: FilterTemplate that can be passed to filter()
+        """
+        assert not isinstance(clause, (dict, FilterTemplate))
+        data = {'query': Query(cls)}
+        resolved = cls._substitute_clause(data, clause)
+        return FilterTemplate(
+            model=cls,
+            source=clause,
+            clause=resolved,
+            joins=tuple(getattr(data['query'], '__joins', [])),
+            to_many=getattr(data['query'], '__to_many', False)
+        )
+
+    @classmethod
+    def _apply_template(cls, template, query):
+        """
+            Apply compiled filter template to query
+            - Joins are reused when already present on query
+            - Conflicting joins (e.g. from other filters) cause the
+            template source to be resolved for the query
+        :return: filtered query
+        """
+        assert template.model is cls
+        joined_aliases = getattr(query, '__aliases', {})
+        if any(
+                joined_aliases.get(name, alias) is not alias
+                for name, alias, _ in template.joins
+        ):
+            data = {'query': query}
+            clause = cls._substitute_clause(data, template.source)
+            return data['query'].filter(clause)
+        setattr(query, '__aliases', joined_aliases)
+        joins = getattr(query, '__joins', [])
+        setattr(query, '__joins', joins)
+        for name, alias, rel in template.joins:
+            if name not in joined_aliases:
+                query = query.outerjoin(alias, rel)
+                joined_aliases[name] = alias
+                joins.append((name, alias, rel))
+        if template.to_many:
+            setattr(query, '__to_many', True)
+        return query.filter(template.clause)
 
     @classmethod
-    def filter(cls, attributes=None, query=None, skip_nones=False):
+    def filter(cls, attributes=None, query=None, skip_nones=False,
+               strategy=None):
         """
             Overloaded filter abstraction. Supported scenarios:
 
@@ -242,7 +436,15 @@ class ModelFilter(ModelAction):
             - Values that are lists are considered as "and" joints
             if they are on *_to_many relationship and "or" joints otherwise
             - Values that are lists are expected to only have unique elements
+            - Values can be FilterOperator, e.g. SpatialOperator (DWithin)
+            for geometry columns. Lists of operators use the same "and" /
+            "or" logic, but can not be mixed with other values
             - None values are pruned if skip_nones is set to True.
+            - The strategy defines how *_to_many relationships are filtered.
+            "exists" uses one EXISTS subquery per value and keeps results
+            unique. None values always use "join", since "join" matches
+            missing relationships. Lists exceeding array_filter_threshold
+            also use "join" to prevent excessive amounts of subqueries.
 
             (2) Pass attributes as SQLAlchemy filter
             Full SQLAlchemy power, but more complex to use.
@@ -251,20 +453,30 @@ class ModelFilter(ModelAction):
             - Relationship paths are resolved automatically minimizing amount
             of joins added to the query
 
-        :param attributes: dict *or* SQLAlchemy filter
+            (3) Pass FilterTemplate as returned from filter_template
+            Same as (2), but relationship paths are only resolved once.
+
+        :param attributes: dict *or* SQLAlchemy filter *or* FilterTemplate
         :param query: Optional (pre-filtered) query used as base
         :param skip_nones: Skip None-values dict entries iff true
+        :param strategy: See FILTER_STRATEGIES, defaults to filter_strategy
         :return: filtered query
         """
         # todo: attributes with list values only unique if dict (add assert)
         # todo: ensure query class is same as current cls (add assert)
         assert skip_nones is False or isinstance(attributes, dict)
+        if strategy is None:
+            strategy = cls.filter_strategy
+        assert strategy in FILTER_STRATEGIES, strategy
         if query is None:
             query = cls.query
 
         if attributes is None:
             return query
 
+        if isinstance(attributes, FilterTemplate):
+            return cls._apply_template(attributes, query)
+
         and_info = cls._get_and_info(query)
 
         # Handle SqlAlchemy filter
@@ -290,6 +502,8 @@ class ModelFilter(ModelAction):
                     value = [value]
                 value = list(set(value))  # make list unique
                 length = len(value)
+                operators = sum(isinstance(v, FilterOperator) for v in value)
+                assert operators in (0, length), attribute
 
                 attr_hierarchy = attribute.split(".")
                 to_many_rel = cls._is_to_many(attr_hierarchy)
@@ -298,12 +512,35 @@ class ModelFilter(ModelAction):
                 if not to_many_rel and length == 0:
                     return cls.query.filter(sql.false())
 
+                if (
+                        to_many_rel and strategy == 'exists' and
+                        None not in value and
+                        length < cls.array_filter_threshold
+                ):
+                    for v in value:  # "all of" semantics
+                        query = query.filter(
+                            cls._get_exists_clause(attr_hierarchy, v))
+                    continue
+
                 query, final_attr = cls._get_joined_attr(query, attr_hierarchy)
                 and_info['counts'][and_info['depth']] += 1
                 if length == 1:
-                    query = query.filter(final_attr == value[0])
+                    query = query.filter(
+                        cls._get_value_clause(final_attr, value[0]))
                 elif length > 1:
-                    if to_many_rel:
+                    if to_many_rel and operators:
+                        if not grouped:
+                            query = query.group_by(cls.id)
+                            grouped = True
+                        # every operator matched by some related entry
+                        query = query.having(and_(*[
+                            func.bool_or(v.clause(final_attr)) for v in value
+                        ]))
+                    elif operators:
+                        query = query.filter(or_(*[
+                            v.clause(final_attr) for v in value
+                        ]))
+                    elif to_many_rel:
                         # group by so we can use count for filter
                         if not grouped:
                             query = query.group_by(cls.id)
@@ -313,10 +550,11 @@ class ModelFilter(ModelAction):
                         # Note: Could possibly result in undesired behaviour
                         # when using duplicate entries in "value" list
                         query = query.having(func.count(distinct(case(
-                            [(final_attr.in_(value), final_attr)],
+                            [(cls._get_in_clause(final_attr, value), final_attr)],
                             else_=None
                         ))) == length)
                     else:
-                        query = query.filter(final_attr.in_(value))
+                        query = query.filter(
+                            cls._get_in_clause(final_attr, value))
             and_info['depth'] -= 1
         return query
@@ -0,0 +1,184 @@
+import functools
+from sqlalchemy import (
+    inspect, func, orm, and_, literal, select, cast, literal_column, Text)
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.orm import aliased
+from painless_sqlalchemy.core.ModelCoreSerialization import (
+    ModelCoreSerialization)
+from painless_sqlalchemy.core.ModelSerialization import PLAN_CACHE_SIZE
+from painless_sqlalchemy.columns.AbstractType import AbstractType
+from painless_sqlalchemy.elements.MapColumn import MapColumn
+
+# maximum amount of key value pairs per json_build_object call
+# (postgres functions accept at most 100 arguments)
+JSON_OBJECT_MAX_PAIRS = 50
+
+
+class ModelJsonSerialization(ModelCoreSerialization):
+    """ Database-side Json Serialization Logic """
+
+    __abstract__ = True
+
+    @staticmethod
+    def _json_build_object(pairs):
+        """
+            Build json object from list of (key, SQL expression)
+            - Large objects are merged from multiple jsonb objects
+            :return: SQL expression of type json
+        """
+        args = [[literal(k), v] for k, v in pairs]
+        if len(args) <= JSON_OBJECT_MAX_PAIRS:
+            return func.json_build_object(*sum(args, []), type_=JSON)
+        chunks = [
+            func.jsonb_build_object(*sum(args[i:i + JSON_OBJECT_MAX_PAIRS], []))
+            for i in range(0, len(args), JSON_OBJECT_MAX_PAIRS)
+        ]
+        return cast(functools.reduce(lambda a, b: a.op("||")(b), chunks), JSON)
+
+    @staticmethod
+    def _get_json_column(alias, key):
+        """
+            Obtain json representation of column on (aliased) model
+            - Custom column types are formatted like their result processor
+            :return: SQL expression
+        """
+        col = getattr(alias, key)
+        if isinstance(col.type, AbstractType):
+            return col.type.json_expression(col)
+        return col
+
+    @staticmethod
+    def _get_json_relationship(alias, key, value):
+        """
+            Build correlated subquery for relationship on (aliased) model
+            :param alias: aliased source model
+            :param key: relationship name on source model
+            :param value: function taking aliased target model returning
+            SQL expression for a single target
+            :return: SQL expression (json array for *_to_many)
+        """
+        prop = getattr(alias, key).property
+        target = aliased(prop.mapper.class_)
+        source = inspect(alias).selectable
+        # pylint: disable-msg=W0212
+        pj, sj, _, dest, secondary, _ = prop._create_joins(
+            source_polymorphic=True, source_selectable=source,
+            dest_polymorphic=True, dest_selectable=inspect(target).selectable,
+            alias_secondary=True)
+        from_obj = [dest] if secondary is None else [dest, secondary]
+        if prop.uselist:
+            mapper = prop.mapper
+            pks = [
+                getattr(target, mapper.get_property_by_column(c).key)
+                for c in mapper.primary_key
+            ]
+            obj = func.coalesce(
+                func.json_agg(aggregate_order_by(value(target), *pks)),
+                literal_column("'[]'::json"))
+            query = select([obj], from_obj=from_obj)
+        else:
+            query = select([value(target)], from_obj=from_obj).limit(1)
+        query = query.where(pj if sj is None else and_(pj, sj))
+        return query.correlate(source).as_scalar()
+
+    @classmethod
+    def _get_json_path(cls, alias, path):
+        """
+            Obtain json representation of MapColumn path
+            - Path may only traverse *_to_one relationships
+            :param alias: aliased source model
+            :param path: list of attributes
+            :return: SQL expression
+        """
+        if len(path) == 1:
+            return cls._get_json_column(alias, path[0])
+        assert not getattr(alias, path[0]).property.uselist, path
+        return cls._get_json_relationship(
+            alias, path[0], lambda t: cls._get_json_path(t, path[1:]))
+
+    @classmethod
+    def _get_json_map(cls, alias, obj, frozen):
+        """
+            Obtain json representation of MapColumn (sub) definition
+            :param alias: aliased model
+            :param obj: MapColumn definition (MapColumn, dict, list or str)
+            :param frozen: frozen hierarchy requested for obj
+            :return: SQL expression
+        """
+        if isinstance(obj, MapColumn) and None in obj:
+            assert len(obj) == 1
+            obj = obj[None]
+        if isinstance(obj, str):
+            return cls._get_json_path(alias, obj.split("."))
+        if isinstance(obj, list):
+            return func.json_build_array(*[
+                cls._get_json_map(alias, e, frozen) for e in obj])
+        assert isinstance(obj, dict)
+        return cls._json_build_object([
+            (k, cls._get_json_map(alias, obj[k], v)) for k, v in frozen])
+
+    @classmethod
+    def _get_json_object(cls, alias, frozen):
+        """
+                Build json object for aliased model
+                - Equivalent to output of compiled dict builder
+            :param alias: aliased model
+            :param frozen: frozen attribute hierarchy
+            :return: SQL expression
+        """
+        inspected = inspect(cls)
+        all_cols = inspected.column_attrs  # includes property columns
+        rels = inspected.relationships
+
+        pairs = []
+        for key, sub in frozen:
+            if key in all_cols:
+                pairs.append((key, cls._get_json_column(alias, key)))
+            elif key in rels:
+                target = rels[key].mapper.class_
+                assert issubclass(target, ModelJsonSerialization)
+                # pylint: disable-msg=W0212
+                pairs.append((key, cls._get_json_relationship(
+                    alias, key, lambda t, c=target, s=sub:
+                    c._get_json_object(t, s))))
+            else:
+                map_column = getattr(cls, key, None)
+                if isinstance(map_column, MapColumn):
+                    pairs.append((
+                        key, cls._get_json_map(alias, map_column, sub)))
+        return cls._json_build_object(pairs)
+
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _compile_json_object(cls, frozen):
+        """
+                Compile json object expression for attribute hierarchy
+            :param frozen: frozen attribute hierarchy
+            :return: tuple(aliased model, SQL expression)
+        """
+        alias = aliased(cls)
+        return alias, cls._get_json_object(alias, frozen)
+
+    @classmethod
+    def serialize_json(cls, *args, **kwargs):
+        """
+                Convert to json document built by the database
+                - Nested objects are built with json_build_object and
+                json_agg in correlated subqueries
+                - No model instances or python dicts are created
+                - Temporal values are returned in ISO 8601 format
+            :param args: See _ser for details
+            :param kwargs: See _ser for details
+            :return: Json array (string)
+        """
+        cls._check_ser_kwargs(kwargs)
+        page, plan = cls._ser(*args, core=True, **kwargs)
+        session = page.session
+        page = page.subquery("page")
+        alias, obj = cls._compile_json_object(
+            cls._freeze_hierarchy(plan.attr_hierarchy))
+        statement = select([cast(func.coalesce(
+            func.json_agg(aggregate_order_by(obj, page.c.dense_rank)),
+            literal_column("'[]'::json")
+        ), Text)]).select_from(orm.join(page, alias, page.c.id == alias.id))
+        return session.execute(statement, kwargs.get('params') or {}).scalar()
@@ -0,0 +1,68 @@
+from painless_sqlalchemy.core.ModelSerialization import ModelSerialization
+from painless_sqlalchemy.util import CursorUtil
+
+
+class ModelPagination(ModelSerialization):
+    """ Paginated Serialization Logic """
+
+    __abstract__ = True
+
+    @classmethod
+    def serialize_keyset(cls, to_return=None, filter_by=None, limit=None,
+                         cursor=None, **kwargs):
+        """
+                Convert to serializable representation using keyset pages
+                - Pass returned cursor to obtain the next page
+                - Cost of deep pages is identical to first page (no offset)
+            :param to_return: See _ser for details
+            :param filter_by: See _ser for details
+            :param limit: maximum amount of objects fetched per page
+            :param cursor: cursor returned for previous page (optional)
+            :param kwargs: See _ser for details
+            :return: tuple(Json serializable representation, next cursor)
+            where next cursor is None if there are no more results
+        """
+        query, plan = cls._ser(
+            to_return, filter_by, limit,
+            keyset=True, cursor=cursor, **kwargs)
+        rows = query.all()
+        build = plan.builder
+        next_cursor = None
+        if rows and limit is not None and len(rows) == limit:
+            next_cursor = CursorUtil.encode_cursor(
+                rows[-1][1 + len(plan.extra_fields):])
+        if plan.extra_fields:
+            return [build(row) for row in rows], next_cursor
+        return [build(row[0]) for row in rows], next_cursor
+
+    @classmethod
+    def serialize_page(cls, to_return=None, filter_by=None, limit=None,
+                       offset=None, **kwargs):
+        """
+                Convert to serializable representation with total count
+                - Total is computed in the same statement as the page
+                - To-many relationships are never "joined" loaded, since
+                joined rows would be counted
+            :param to_return: See _ser for details
+            :param filter_by: See _ser for details
+            :param limit: See _ser for details
+            :param offset: See _ser for details
+            :param kwargs: See _ser for details
+            :return: tuple(Json serializable representation, total amount
+            of results ignoring limit and offset)
+        """
+        query, plan = cls._ser(
+            to_return, filter_by, limit, offset, total=True, **kwargs)
+        rows = query.all()
+        if rows:
+            total = rows[0][-1]
+        elif offset:  # page is out of range, total needs to be queried
+            query, _ = cls._ser(to_return, filter_by, core=True, **dict(
+                kwargs, extra_fields=None))
+            total = query.order_by(None).count()
+        else:
+            total = 0
+        build = plan.builder
+        if plan.extra_fields:
+            return [build(row) for row in rows], total
+        return [build(row[0]) for row in rows], total
@@ -13,6 +13,7 @@ class ModelRaw(_Base):
     query = None
     session = None
     engine = None
+    cache = None
 
     # Id is always required but can be overwritten
     id = Column(Integer, primary_key=True)
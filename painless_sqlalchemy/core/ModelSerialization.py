@@ -1,31 +1,74 @@
-import re
 import functools
-from sqlalchemy import inspect, func
-from sqlalchemy.orm import load_only, undefer, joinedload, ColumnProperty
-from sqlalchemy.sql.elements import Label
+from collections import namedtuple
+from sqlalchemy import inspect, func, orm, sql, and_, or_, tuple_, literal
+from sqlalchemy.orm import load_only, undefer, ColumnProperty
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import Label, UnaryExpression
 from painless_sqlalchemy.core.ModelRaw import ModelRaw
-from painless_sqlalchemy.core.ModelFilter import ModelFilter
+from painless_sqlalchemy.core.ModelExposure import ModelExposure
 from painless_sqlalchemy.elements.MapColumn import MapColumn
-from painless_sqlalchemy.util import DictUtil
-
-RE_FIELD_SYNTAX_MATCHER = re.compile(r'([^,()]+?)\(([^()]+?)\)')
-
-
-class ModelSerialization(ModelFilter):
+from painless_sqlalchemy.util import DictUtil, CursorUtil
+
+# maximum amount of compiled serialization plans kept in memory
+PLAN_CACHE_SIZE = 512
+
+# relationship loading strategies that can be requested
+LOAD_STRATEGIES = {
+    'joined': 'joinedload',
+    'selectin': 'selectinload',
+    'subquery': 'subqueryload'
+}
+
+# handling of model instances already present in the session
+# - refresh: overwrite loaded attributes with fetched data
+# - identity: reuse loaded, unexpired attributes (only unloaded and expired
+# attributes are populated from fetched data)
+FRESHNESS = ('refresh', 'identity')
+
+# _ser arguments changing the shape of result rows. Only passed internally
+# (see serialize_keyset, serialize_page, serialize_core and serialize_json)
+ROW_SHAPE_ARGS = ('keyset', 'cursor', 'core', 'total')
+
+# Serialization information that only depends on model and requested fields
+# - fields: expanded and exposed fields to populate (dot notation)
+# - to_fetch: columns that need fetching from db (dot notation)
+# - fetch_options: load options for the base query
+# - load_options: eager load options for the final query
+# - attr_hierarchy: output hierarchy as dict
+# - builder: compiled function converting model instance to output dict
+# - tables: names of all tables data is loaded from
+# - extra_fields: names of selected extra fields. If present the builder
+# expects result rows tuple(model, *extra field values, ...)
+SerializationPlan = namedtuple('SerializationPlan', [
+    'fields', 'to_fetch', 'fetch_options', 'load_options', 'attr_hierarchy',
+    'builder', 'tables', 'extra_fields'
+])
+
+class ModelSerialization(ModelExposure):
     """ Query Serialization Logic """
 
     __abstract__ = True
 
     @classmethod
-    def _eager_load(cls, attributes, query):
+    def _get_load_options(cls, attributes, load_strategy=None):
         """
-                Alter query to only load provided attributes
+                Compute options that only load provided attributes
                 - Attributes are *not* auto expanded
+                - By default to-one relationships are "joined" and to-many
+                relationships "selectin" loaded. This prevents cartesian
+                explosion of rows for nested to-many relationships and is
+                compatible with yield_per
             :param attributes: list of attributes using dot notation
-            :param query: query to optimize (optional)
-            :return: altered query
+            :param load_strategy: Strategy name used for all relationships
+            or dict mapping relationship paths (dot notation) to strategy name
+            :return: list of query options
         """
-        assert isinstance(attributes, list)
+        assert isinstance(attributes, (list, tuple))
+        assert load_strategy is None or isinstance(load_strategy, (str, dict))
+        if isinstance(load_strategy, str):
+            assert load_strategy in LOAD_STRATEGIES, load_strategy
+        if isinstance(load_strategy, dict):
+            assert all(v in LOAD_STRATEGIES for v in load_strategy.values())
 
         # collect table columns (not relationships)
         all_cols = inspect(cls).column_attrs
@@ -37,88 +80,163 @@ class ModelSerialization(ModelFilter):
         # extract non-property columns
         real_cols = list(set(all_cols) - set(property_cols))
 
+        result = []
         # determine which relationships to fetch
         for key in attributes:
             if key not in all_cols:
                 path = key.split(".")
                 assert len(path) > 1, path
                 # Note: Not equivalent to joinedload(*path[:-1])
-                jl = joinedload(path[0])
-                for e in path[1:-1]:
-                    jl = jl.joinedload(e)
-                query = query.options(jl.load_only(path[-1]))
+                loader, class_ = orm, cls
+                for i, e in enumerate(path[:-1]):
+                    prop = getattr(class_, e).property
+                    strategy = 'selectin' if prop.uselist else 'joined'
+                    if isinstance(load_strategy, str):
+                        strategy = load_strategy
+                    elif isinstance(load_strategy, dict):
+                        strategy = load_strategy.get(
+                            ".".join(path[:i + 1]), strategy)
+                    loader = getattr(loader, LOAD_STRATEGIES[strategy])(e)
+                    class_ = prop.mapper.class_
+                result.append(loader.load_only(path[-1]))
 
         # determine which real columns to load
         to_load = [key for key in attributes if key in real_cols]
         if to_load:
-            query = query.options(load_only(*to_load))
+            result.append(load_only(*to_load))
 
         # determine which property columns to load
         to_undefer = [key for key in attributes if key in property_cols]
-        if to_undefer:
-            for property_col in to_undefer:
-                query = query.options(undefer(property_col))
+        for property_col in to_undefer:
+            result.append(undefer(property_col))
 
-        return query
+        return result
 
-    def _as_dict(self, obj, dict_):
+    @classmethod
+    def _eager_load(cls, attributes, query):
         """
-                Convert SQLAlchemy object hierarchy into new dict
-                - Elements that are not loaded are not returned (!)
-            :param obj: object hierarchy
-            :param dict_: dict defining target format
-            :return: New dict containing extracted data
+                Alter query to only load provided attributes
+                - Attributes are *not* auto expanded
+            :param attributes: list of attributes using dot notation
+            :param query: query to optimize (optional)
+            :return: altered query
+        """
+        assert isinstance(attributes, list)
+        return query.options(*cls._get_load_options(attributes))
+
+    @staticmethod
+    def _freeze_hierarchy(attr_hierarchy):
+        """
+            Convert attribute hierarchy into hashable representation
+            :param attr_hierarchy: dict representation of hierarchy
+            :return: nested, sorted tuple of (key, children)
+        """
+        return tuple(sorted(
+            (k, ModelSerialization._freeze_hierarchy(v))
+            for k, v in attr_hierarchy.items()
+        ))
+
+    @classmethod
+    def _compile_map_resolver(cls, obj, frozen):
+        """
+                Compile function resolving MapColumn (sub) definition
+            :param obj: MapColumn definition (MapColumn, dict, list or str)
+            :param frozen: frozen hierarchy requested for obj
+            :return: function taking model instance returning resolved data
         """
         if isinstance(obj, MapColumn) and None in obj:
             assert len(obj) == 1
             obj = obj[None]
         if isinstance(obj, str):
-            return functools.reduce(
-                lambda e, a: getattr(e, a, None),
-                obj.split("."),
-                self
-            )
+            path = obj.split(".")
+            return lambda o: functools.reduce(
+                lambda e, a: getattr(e, a, None), path, o)
         if isinstance(obj, list):
-            return [self._as_dict(e, dict_) for e in obj]
+            resolvers = [cls._compile_map_resolver(e, frozen) for e in obj]
+            return lambda o: [r(o) for r in resolvers]
+        assert isinstance(obj, dict)
+        resolvers = []
+        for k, v in frozen:
+            assert k in obj
+            resolvers.append((k, cls._compile_map_resolver(obj[k], v)))
+        return lambda o: {k: r(o) for k, r in resolvers}
 
-        result = {}
-        if isinstance(obj, dict):
-            for k, v in dict_.items():
-                assert k in obj
-                result[k] = self._as_dict(obj[k], v)
-        else:
-            assert isinstance(obj, ModelSerialization)
-            inspected = inspect(obj.__class__)
-            all_cols = inspected.column_attrs  # includes property columns
-            rels = inspected.relationships
-
-            # handle MapColumn
-            for key in filter(lambda e: e not in obj.__dict__, dict_.keys()):
-                map_column = getattr(obj.__class__, key)
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _compile_dict_builder(cls, frozen):
+        """
+                Compile function converting model instance into new dict
+                - Elements that are not loaded are not returned (!)
+                - Lookups are resolved once and child builders compiled
+                recursively
+            :param frozen: frozen attribute hierarchy
+            :return: function taking model instance returning dict
+        """
+        inspected = inspect(cls)
+        all_cols = inspected.column_attrs  # includes property columns
+        rels = inspected.relationships
+
+        map_columns, columns, relationships = [], [], []
+        for key, sub in frozen:
+            if key in all_cols:
+                columns.append(key)
+            elif key in rels:
+                target = rels[key].mapper.class_
+                assert issubclass(target, ModelSerialization)
+                # pylint: disable-msg=W0212
+                relationships.append((key, target._compile_dict_builder(sub)))
+            else:
+                map_column = getattr(cls, key, None)
                 if isinstance(map_column, MapColumn):
-                    result[key] = self._as_dict(map_column, dict_[key])
+                    map_columns.append(
+                        (key, cls._compile_map_resolver(map_column, sub)))
 
+        def build(obj):
             # only return valid arguments, this is necessary since
             # primary keys can not be deferred and objects could be
             # cached (second could be circumvented with a fresh session)
-            for key in filter(lambda e: e in obj.__dict__, dict_.keys()):
-                value = obj.__dict__.get(key)
-                if key in all_cols:
-                    result[key] = value
-                elif key in rels:
+            state = obj.__dict__
+            result = {key: resolve(obj) for key, resolve in map_columns}
+            for key in columns:
+                if key in state:
+                    result[key] = state[key]
+            for key, child in relationships:
+                if key in state:
+                    value = state[key]
                     # recursively fetch data from other objects
                     if isinstance(value, list):
-                        # pylint: disable-msg=W0212
-                        result[key] = [
-                            rel_obj._as_dict(rel_obj, dict_[key])
-                            for rel_obj in value
-                        ]
-                    elif isinstance(value, ModelSerialization):
-                        # pylint: disable-msg=W0212
-                        result[key] = value._as_dict(value, dict_[key])
-                    else:  # if None
-                        result[key] = value
-        return result
+                        result[key] = [child(e) for e in value]
+                    elif value is None:
+                        result[key] = None
+                    else:
+                        result[key] = child(value)
+            return result
+        return build
+
+    @classmethod
+    def _get_dict_builder(cls, attr_hierarchy):
+        """
+                Obtain compiled dict builder for attribute hierarchy
+            :param attr_hierarchy: dict defining target format
+            :return: function taking model instance returning dict
+        """
+        # pylint: disable-msg=W0212
+        return cls._compile_dict_builder(cls._freeze_hierarchy(attr_hierarchy))
+
+    def _as_dict(self, obj, dict_):
+        """
+                Convert SQLAlchemy object hierarchy into new dict
+                - Elements that are not loaded are not returned (!)
+                - Uses compiled dict builder of object class
+            :param obj: object hierarchy (model instance or list)
+            :param dict_: dict defining target format
+            :return: New dict containing extracted data
+        """
+        if isinstance(obj, list):
+            return [self._as_dict(e, dict_) for e in obj]
+        assert isinstance(obj, ModelSerialization)
+        # pylint: disable-msg=W0212
+        return obj._get_dict_builder(dict_)(obj)
 
     @staticmethod
     def _get_attr_hierarchy(attributes):
@@ -139,17 +257,16 @@ class ModelSerialization(ModelFilter):
         return attr_hierarchy
 
     @classmethod
-    def _as_list(cls, query, attributes):
+    def _as_list(cls, query, plan):
         """
-            Serialize query results using attributes as template.
+            Serialize query results using plan hierarchy as template.
             - Only contains fetched relationships from query
             :param query: query to serialize
-            :param attributes: attribute list in dot notation
+            :param plan: serialization plan used to build query
             :return list of serialized query results
         """
-        attr_hierarchy = cls._get_attr_hierarchy(attributes)
-        # pylint: disable-msg=W0212
-        return [res._as_dict(res, attr_hierarchy) for res in query]
+        build = plan.builder
+        return [build(res) for res in query]
 
     @classmethod
     def has(cls, key):
@@ -168,6 +285,76 @@ class ModelSerialization(ModelFilter):
         except (AttributeError, KeyError, AssertionError):
             return False
 
+    @staticmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _parse_fields(key):
+        """
+            Parse field specification in a single pass
+            - supports bracket notation e.g. "rel(field1,rel2(field2))"
+            - supports multiple fields e.g. "rel.field1,rel.field2"
+            - Result is cached since it does not depend on model
+            :param key: comma separated paths (dot notation)
+            :return tuple of paths (dot notation) with brackets resolved
+            :raises ValueError: for malformed specification
+        """
+        result, prefixes, name = [], [""], ""
+        expect_separator = False  # after closing bracket
+        for char in key + ",":
+            if char in ",()":
+                if char == "(":
+                    if not name or expect_separator:
+                        raise ValueError("Invalid field specification: %s" % key)
+                    prefixes.append(prefixes[-1] + name + ".")
+                elif not expect_separator:
+                    if not name:
+                        raise ValueError("Invalid field specification: %s" % key)
+                    result.append(prefixes[-1] + name)
+                if char == ")":
+                    if len(prefixes) == 1:
+                        raise ValueError("Invalid field specification: %s" % key)
+                    prefixes.pop()
+                name, expect_separator = "", char == ")"
+            elif expect_separator:
+                raise ValueError("Invalid field specification: %s" % key)
+            else:
+                name += char
+        if len(prefixes) != 1:
+            raise ValueError("Invalid field specification: %s" % key)
+        return tuple(result)
+
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _expand_path(cls, path):
+        """
+            Expand star notation of single path (dot notation)
+            :return tuple of expanded paths (dot notation)
+        """
+        if path.split(".")[-1] != "*":  # ordinary field, no expansion needed
+            return (path,)
+        # path ends in relationship
+        _, end = next(
+            (cl, c) for cl, c, last in cls._iterate_path(path.split(".")[:-1])
+            if last is True
+        )
+        if isinstance(end, dict):
+            fields = DictUtil.flatten_dict(end)
+        else:
+            assert issubclass(end, ModelRaw)
+            fields = end.default_serialization
+        result = ()
+        for f in fields:
+            result += cls._expand(path[:-1] + f)
+        return result
+
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _expand(cls, key):
+        """ Cached implementation of expand() returning tuple """
+        result = ()
+        for path in cls._parse_fields(key):
+            result += cls._expand_path(path)
+        return result
+
     @classmethod
     def expand(cls, key):
         """
@@ -177,42 +364,12 @@ class ModelSerialization(ModelFilter):
                 defined default_serialization
                 - supports multiple fields e.g. "rel.field1,rel.field2"
                 - Handles MapColumns correctly
+                - Results are cached per model and key
             :param key: comma separated paths (dot notation)
             :return list of expanded paths (dot notation)
+            :raises ValueError: for malformed specification
         """
-        if "(" in key:  # expand rel(field,...)-syntax
-            replaced = -1
-            while replaced != 0:
-                key, replaced = RE_FIELD_SYNTAX_MATCHER.subn(
-                    lambda m: ",".join([
-                        "%s.%s" % (m.group(1), e)
-                        for e in m.group(2).split(",")
-                    ]),
-                    key
-                )
-
-        result = []
-        if "," in key:  # contains multiple keys
-            for k in key.split(","):
-                result += cls.expand(k)
-        else:
-            path = key.split(".")
-            if path[-1] == "*":  # path ends in relationship
-                _, end = next(
-                    (cl, c) for cl, c, last in cls._iterate_path(path[:-1])
-                    if last is True
-                )
-                if isinstance(end, dict):
-                    for f in DictUtil.flatten_dict(end):
-                        result += cls.expand(key[:-1] + f)
-                else:
-                    assert issubclass(end, ModelRaw)
-                    for f in end.default_serialization:
-                        result += cls.expand(key[:-1] + f)
-            else:  # ordinary field, no expansion needed
-                result.append(key)
-
-        return result
+        return list(cls._expand(key))
 
     @classmethod
     def _get_query_columns(cls, attributes):
@@ -262,40 +419,182 @@ class ModelSerialization(ModelFilter):
         return result
 
     @classmethod
-    def _is_exposed_column(cls, field):
-        """
-            Check field is exposed, i.e.
-            - not exposed columns
-            - column referencing not exposed columns
-            - exposure is specified explicitly in "exposed" info dict
-            - exposure default to false iff column is primary key
-            :return True iff column is exposed
-        """
-        path = field.split(".")
-        cols = cls._get_column(path)
-        if not isinstance(cols, list):
-            cols = [cols]
-        for col in cols:
-            # check for foreign key id reference that is not exposed
-            for fk in getattr(col, 'foreign_keys', set()):
-                is_primary_key = fk.column.primary_key
-                fk_table = fk.column.table.name
-                assert fk_table.quote is None
-                if not fk.column.info.get("exposed", not is_primary_key):
-                    return False
-
-            # check if exposed
-            if not col.info.get("exposed", not col.primary_key):
-                assert col.class_.__table__.name.quote is None
-                return False
-
-        # this field can be exposed
-        return True
+    def _get_keyset_key(cls, clause):
+        """
+            Split order_by entry into column and ordering information
+            - Null ordering defaults to postgres behaviour
+            - Expressions that are not columns of this model are considered
+            nullable (joined columns are outer joined)
+            :return: tuple(column, descending, nulls first, nullable)
+        """
+        descending, nulls_first = False, None
+        while isinstance(clause, UnaryExpression) and clause.modifier in (
+            operators.asc_op, operators.desc_op,
+            operators.nullsfirst_op, operators.nullslast_op
+        ):
+            if clause.modifier is operators.desc_op:
+                descending = True
+            elif clause.modifier is operators.nullsfirst_op:
+                nulls_first = True
+            elif clause.modifier is operators.nullslast_op:
+                nulls_first = False
+            clause = clause.element
+        if nulls_first is None:
+            nulls_first = descending
+        nullable = (
+            getattr(clause, 'nullable', True) or
+            getattr(clause, 'table', None) is not cls.__table__
+        )
+        return clause, descending, nulls_first, nullable
+
+    @staticmethod
+    def _get_keyset_clause(keys, values):
+        """
+            Build clause selecting all rows ordered after values
+            - Uses (index friendly) row value comparison where possible
+            - Expands comparison to support mixed ordering and null values
+            :param keys: list of tuple(column, descending, nulls first,
+            nullable) as returned from _get_keyset_key
+            :param values: values of the last row of the previous page
+            :return: SQLAlchemy clause
+        """
+        assert len(keys) == len(values)
+        directions = set(k[1] for k in keys)
+        if len(directions) == 1 and not any(k[3] for k in keys):
+            columns = tuple_(*[k[0] for k in keys])
+            row = tuple_(*[literal(v, k[0].type) for k, v in zip(keys, values)])
+            return columns < row if directions.pop() else columns > row
+        result = []
+        for i, ((col, descending, nulls_first, nullable), value) in enumerate(
+                zip(keys, values)):
+            if value is None:
+                after = col.isnot(None) if nulls_first else sql.false()
+            else:
+                after = col < value if descending else col > value
+                if nullable and not nulls_first:
+                    after = or_(after, col.is_(None))
+            result.append(and_(*[
+                c.is_(None) if v is None else c == v
+                for (c, _, _, _), v in zip(keys[:i], values[:i])
+            ] + [after]))
+        return or_(*result)
+
+    @classmethod
+    @functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+    def _get_plan(cls, to_return, expose_all, load_strategy=None):
+        """
+                Compile serialization plan for fields to return.
+                - Result only depends on model, fields and options and
+                is hence cached (bounded, least recently used)
+            :param to_return: tuple of fields to return
+            :param expose_all: Whether to Return not exposed fields
+            :param load_strategy: Relationship loading strategy as string or
+            tuple of (relationship path, strategy) tuples
+            :return: SerializationPlan
+        """
+        # expand relationships to default fields
+        expanded = []
+        for path in to_return:
+            expanded += cls.expand(path)
+        to_return = expanded
+
+        # remove not exposed columns
+        if expose_all is not True:
+            to_return = list(filter(cls._is_exposed_column, to_return))
+
+        # todo: should only expire column that use param
+        # remove duplicated and store so we know what to populate
+        json_to_populate = list(set(to_return))
+        # obtain all columns that need fetching from db
+        to_fetch = list(set(cls._get_query_columns(to_return)))
+
+        # we only need foreign key and request columns
+        # Note: Primary keys are loaded automatically by sqlalchemy
+        # pylint: disable=E1101
+        fks = [col.name for col in cls.__table__.columns if col.foreign_keys]
+        eager_cols = [col for col in to_fetch if "." not in col]
+        to_load = [getattr(cls, e) for e in list(set(fks + eager_cols))]
+        assert all(hasattr(e, 'type') for e in to_load)
+
+        # obtain tables for cache invalidation
+        tables = set(t.fullname for t in inspect(cls).tables)
+        for field in to_fetch:
+            class_ = cls
+            for key in field.split(".")[:-1]:
+                prop = getattr(class_, key).property
+                class_ = prop.mapper.class_
+                tables.update(t.fullname for t in prop.mapper.tables)
+                if prop.secondary is not None:
+                    tables.add(prop.secondary.fullname)
+
+        attr_hierarchy = cls._get_attr_hierarchy(json_to_populate)
+        return SerializationPlan(
+            fields=tuple(json_to_populate),
+            to_fetch=tuple(to_fetch),
+            fetch_options=(load_only(*to_load),),
+            load_options=tuple(cls._get_load_options(
+                to_fetch, dict(load_strategy) if isinstance(
+                    load_strategy, tuple) else load_strategy)),
+            attr_hierarchy=attr_hierarchy,
+            builder=cls._get_dict_builder(attr_hierarchy),
+            tables=frozenset(tables),
+            extra_fields=()
+        )
+
+    @classmethod
+    def _get_total_strategy(cls, to_fetch, load_strategy):
+        """
+                Replace "joined" by "selectin" for to-many relationships
+                - Used when counting total results in the same statement
+            :param to_fetch: tuple of fields to fetch (dot notation)
+            :param load_strategy: Strategy name or tuple of (relationship
+            path, strategy) tuples
+            :return: tuple of (relationship path, strategy) tuples
+        """
+        strategies = {}
+        if isinstance(load_strategy, tuple):
+            strategies, load_strategy = dict(load_strategy), None
+        result = {}
+        for field in to_fetch:
+            class_, path = cls, field.split(".")
+            for i, key in enumerate(path[:-1]):
+                prop = getattr(class_, key).property
+                name = ".".join(path[:i + 1])
+                strategy = strategies.get(name, load_strategy)
+                if strategy is None:
+                    strategy = 'selectin' if prop.uselist else 'joined'
+                if prop.uselist and strategy == 'joined':
+                    strategy = 'selectin'
+                result[name] = strategy
+                class_ = prop.mapper.class_
+        return tuple(sorted(result.items()))
+
+    @staticmethod
+    def _get_extra_plan(plan, names):
+        """
+                Extend serialization plan by extra fields
+                - Builder expects result rows tuple(model, *extra values, ...)
+            :param plan: SerializationPlan
+            :param names: sorted tuple of extra field names
+            :return: SerializationPlan
+        """
+        assert not set(names) & set(plan.fields), names
+        build = plan.builder
+
+        def builder(row):
+            result = build(row[0])
+            result.update(zip(names, row[1:]))
+            return result
+
+        return plan._replace(
+            fields=plan.fields + names, builder=builder, extra_fields=names)
 
     @classmethod
     def _ser(cls, to_return=None, filter_by=None, limit=None, offset=None,
              query=None, skip_nones=False, order_by=None, session=None,
-             expose_all=False, params=None):
+             expose_all=False, params=None, load_strategy=None, keyset=False,
+             cursor=None, core=False, total=False, freshness='refresh',
+             filter_strategy=None, extra_fields=None):
         """
                 Prepare query and fields to fetch obtain (from it)
                 The query only fetches necessary fields.
@@ -309,9 +608,32 @@ class ModelSerialization(ModelFilter):
             :param session: Explict session to use for query
             :param expose_all: Whether to Return not exposed fields
             :param params: Query parameters
-            :return: tuple(query, json_to_serialize)
+            :param load_strategy: Relationship loading strategy ("joined",
+            "selectin" or "subquery") for all relationships or as dict mapping
+            relationship paths (dot notation) to strategies. Defaults to
+            "joined" for to-one and "selectin" for to-many relationships
+            :param keyset: Use keyset pagination. Results are returned as
+            tuple(model, *order_by values) where order_by values form cursor
+            :param cursor: Values of previous page last row (opaque cursor)
+            :param core: Only select tuple(id, dense_rank) of page models
+            :param total: Additionally select total amount of results
+            (ignoring limit and offset) as last tuple element
+            :param freshness: Handling of instances already loaded into the
+            session. Either "refresh" (default) or "identity". See FRESHNESS
+            :param filter_strategy: Strategy for filtering *_to_many
+            relationships, see ModelFilter.filter for details
+            :param extra_fields: dict mapping additional output field names
+            to SQLAlchemy expressions (e.g. distance of nearest())
+            :return: tuple(query, serialization plan)
         """
         assert params is None or isinstance(params, dict)
+        assert extra_fields is None or isinstance(extra_fields, dict)
+        assert core is not True or not extra_fields
+        assert freshness in FRESHNESS, freshness
+        assert cursor is None or keyset is True
+        assert core is not True or keyset is not True
+        assert core is not True or total is not True
+        assert keyset is not True or offset is None
         assert to_return is None or isinstance(to_return, (list, tuple))
 
         if to_return is None:
@@ -322,32 +644,32 @@ class ModelSerialization(ModelFilter):
             x for x in to_return if to_return.count(x) > 1
         ]
 
-        # expand relationships to default fields
-        expanded = []
-        for path in to_return:
-            expanded += cls.expand(path)
-        to_return = expanded
-
-        # remove not exposed columns
-        if expose_all is not True:
-            to_return = list(filter(cls._is_exposed_column, to_return))
-
-        # todo: should only expire column that use param
-        # remove duplicated and store so we know what to populate
-        json_to_populate = list(set(to_return))
-        # obtain all columns that need fetching from db
-        to_fetch = list(set(cls._get_query_columns(to_return)))
-
+        if isinstance(load_strategy, dict):
+            load_strategy = tuple(sorted(load_strategy.items()))
+        plan = cls._get_plan(
+            tuple(to_return), expose_all is True, load_strategy)
+        if total is True and load_strategy is not None:
+            # joined to-many rows would be counted by the window function
+            load_strategy = cls._get_total_strategy(
+                plan.to_fetch, load_strategy)
+            plan = cls._get_plan(
+                tuple(to_return), expose_all is True, load_strategy)
+
+        # results of custom queries are not guaranteed to be unique
+        unique = query is None
         if query is None:
             query = cls.query
         if session is not None:
             query = query.with_session(session)
         if params is not None:
             query = query.params(**params)
-        # ensure that fresh data is loaded
-        query = query.populate_existing()
+        if freshness == 'refresh':
+            # ensure that fresh data is loaded
+            query = query.populate_existing()
         if filter_by is not None:
-            query = cls.filter(filter_by, query, skip_nones=skip_nones)
+            query = cls.filter(
+                filter_by, query, skip_nones=skip_nones,
+                strategy=filter_strategy)
 
         # handle consistent ordering and tuple in all cases
         if order_by is None:
@@ -362,40 +684,81 @@ class ModelSerialization(ModelFilter):
                 order_by = (order_by, )
         assert isinstance(order_by, tuple)
 
-        # join columns in order_by where necessary
+        # join columns in order_by and extra fields where necessary
         data = {'query': query}
         order_by = cls._substitute_clause(data, order_by)
+        extra_columns = ()
+        if extra_fields:
+            plan = cls._get_extra_plan(plan, tuple(sorted(extra_fields)))
+            extra_columns = tuple(
+                cls._substitute_clause(data, extra_fields[name]).label(
+                    "_extra_%d" % i)
+                for i, name in enumerate(plan.extra_fields))
         query = data['query']
 
-        # we only need foreign key and request columns
-        # Note: Primary keys are loaded automatically by sqlalchemy
-        # pylint: disable=E1101
-        fks = [col.name for col in cls.__table__.columns if col.foreign_keys]
-        eager_cols = [col for col in to_fetch if "." not in col]
-        to_load = [getattr(cls, e) for e in list(set(fks + eager_cols))]
-        assert all(hasattr(e, 'type') for e in to_load)
-        query = query.options(load_only(*to_load))
-        # only return one line per result model so we can use limit and offset
-        query = query.distinct(cls.id)
+        # select ordering values and only fetch rows after cursor
+        cursor_columns = ()
+        if keyset is True:
+            keys = [cls._get_keyset_key(c) for c in order_by]
+            cursor_columns = tuple(
+                k[0].label("_cursor_%d" % i) for i, k in enumerate(keys))
+            if cursor is not None:
+                values = CursorUtil.decode_cursor(cursor)
+                if len(values) != len(keys):
+                    raise ValueError("Invalid cursor given.")
+                query = query.filter(cls._get_keyset_clause(keys, values))
+
+        # window function is evaluated before limit and offset
+        total_columns = ()
+        if total is True:
+            total_columns = (func.count().over().label("_total"),)
         dense_rank = func.dense_rank().over(  # remember the actual order
             order_by=order_by).label("dense_rank")
-        query = query.add_columns(dense_rank)
-        query = query.from_self(cls)
-        query = query.order_by(dense_rank)
+
+        query = query.options(*plan.fetch_options)
+        # no *_to_many joins, so there is exactly one row per model
+        if unique and not getattr(query, '__to_many', False):
+            if core is True:
+                query = query.with_entities(cls.id.label("id"), dense_rank)
+            else:
+                query = query.add_columns(
+                    *extra_columns, *cursor_columns, *total_columns)
+            query = query.order_by(*order_by)
+        else:
+            # only return one line per result model so we can use limit
+            # and offset
+            query = query.distinct(cls.id)
+            query = query.add_columns(
+                dense_rank, *extra_columns, *cursor_columns)
+            if core is True:
+                query = query.from_self(cls.id.label("id"), dense_rank)
+            else:
+                query = query.from_self(
+                    cls, *extra_columns, *cursor_columns, *total_columns)
+            query = query.order_by(dense_rank)
 
         if limit is not None:
             query = query.limit(limit)
         if offset is not None:
             query = query.offset(offset)
 
-        query = cls._eager_load(to_fetch, query)
+        if core is not True:
+            query = query.options(*plan.load_options)
 
         # for query debugging use
         # import sqlalchemy.dialects.postgresql as postgresql
         # print(query.statement.compile(dialect=postgresql.dialect()))
         # print("===========")
 
-        return query, json_to_populate
+        return query, plan
+
+    @staticmethod
+    def _check_ser_kwargs(kwargs):
+        """ Reject _ser arguments that are only supported internally """
+        invalid = sorted(k for k in ROW_SHAPE_ARGS if k in kwargs)
+        if invalid:
+            raise TypeError(
+                "Unexpected keyword argument(s): %s" % ", ".join(invalid))
 
     @classmethod
     def serialize(cls, *args, **kwargs):
@@ -405,4 +768,24 @@ class ModelSerialization(ModelFilter):
             :param kwargs: See _ser for details
             :return: Json serializable representation
         """
+        cls._check_ser_kwargs(kwargs)
         return cls._as_list(*cls._ser(*args, **kwargs))
+
+    @classmethod
+    def serialize_iter(cls, *args, batch_size=1000, **kwargs):
+        """
+                Convert to serializable representation one by one
+                - Results are fetched in batches using a server side cursor
+                - Memory usage is bounded by batch size
+                - Joined loading of to-many relationships is not supported
+            :param args: See _ser for details
+            :param batch_size: Amount of results fetched per batch
+            :param kwargs: See _ser for details
+            :return: Generator of Json serializable representations
+        """
+        assert isinstance(batch_size, int) and batch_size > 0
+        cls._check_ser_kwargs(kwargs)
+        query, plan = cls._ser(*args, **kwargs)
+        build = plan.builder
+        for res in query.yield_per(batch_size):
+            yield build(res)
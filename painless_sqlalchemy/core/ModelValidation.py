@@ -14,8 +14,33 @@ class ModelValidation(ModelRaw):
     def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
         if cls not in cls._initialized_classes:  # init exactly once per Model class
             cls._initialized_classes.append(cls)
+            for col_name, validator in cls._get_validators().items():
+                event.listen(getattr(cls, col_name), "set", validator)
+        return super(ModelValidation, cls).__new__(cls)
+
+    @classmethod
+    def _get_validators(cls):
+        """
+            Get validators of custom column types (computed once per class)
+            :return dict mapping column name to validator
+        """
+        if '_validators' not in cls.__dict__:
+            validators = {}
             for col_name in inspect(cls).column_attrs.keys():
                 attr = getattr(cls, col_name)
                 if isinstance(attr.type, AbstractType):
-                    event.listen(attr, "set", attr.type.validator(col_name))
-        return super(ModelValidation, cls).__new__(cls)
+                    validators[col_name] = attr.type.validator(col_name)
+            cls._validators = validators
+        return cls._validators
+
+    @classmethod
+    def validate(cls, values):
+        """
+            Validate values without instantiating model
+            - Raises same errors as assignment to model attributes
+            :param values: dict mapping column names to values
+        """
+        validators = cls._get_validators()
+        for key, value in values.items():
+            if key in validators:
+                validators[key](None, value, None, None)
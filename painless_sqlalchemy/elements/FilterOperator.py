@@ -0,0 +1,10 @@
+class FilterOperator():
+    """
+        Dict filter value compiling to custom clause, e.g. {"key": op}
+        - Resolved against (joined) column of key
+        - See SpatialOperator for operators on geometry columns
+    """
+
+    def clause(self, column):
+        """ Build filter clause for column """
+        raise NotImplementedError()
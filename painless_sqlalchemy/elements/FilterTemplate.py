@@ -0,0 +1,20 @@
+class FilterTemplate():
+    """
+        Filter clause compiled for a model. Relationship paths are resolved
+        once and the template can be applied to many queries. Values are
+        passed as bindparam placeholders using query params.
+    """
+
+    def __init__(self, model, source, clause, joins, to_many):
+        """
+            :param model: model the template was compiled for
+            :param source: clause as passed (unresolved)
+            :param clause: clause with resolved relationship paths
+            :param joins: tuple of (alias name, alias, relationship)
+            :param to_many: True iff *_to_many relationship is joined
+        """
+        self.model = model
+        self.source = source
+        self.clause = clause
+        self.joins = joins
+        self.to_many = to_many
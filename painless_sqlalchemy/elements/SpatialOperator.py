@@ -0,0 +1,122 @@
+from geoalchemy2 import Geography
+from sqlalchemy import func, cast, literal, Float
+from painless_sqlalchemy.columns.AreaType import AreaType
+from painless_sqlalchemy.columns.LocationType import LocationType
+from painless_sqlalchemy.elements.ColumnReference import ref
+from painless_sqlalchemy.elements.FilterOperator import FilterOperator
+from painless_sqlalchemy.util.LocationUtil import (
+    validate_longlat, validate_longitude, validate_latitude)
+
+# srid used for geometry columns and operands
+SRID = 4326
+
+
+def as_geography(column):
+    """
+        Cast geometry to geography (distances in meters)
+        - Expression matches gist_index(..., geography=True)
+    """
+    return cast(column, Geography(srid=SRID))
+
+
+def as_geometry(value):
+    """
+        Typed literal for python location or area
+        - Tuple is considered location, list is considered area
+    """
+    if isinstance(value, tuple):
+        validate_longlat(value)
+        return literal(value, LocationType())
+    assert isinstance(value, list), value
+    for v in value:
+        validate_longlat(v)
+    return literal(value, AreaType(None))
+
+
+def nearest(column, value):
+    """
+        Distance (meters) to location or area using KNN operator (<->)
+        - Use as order_by to obtain nearest first. The GiST index created
+        by gist_index(..., geography=True) returns the top N without
+        scanning the table
+        - Can be selected as extra field to return the distance
+    :param column: geometry column or relationship path (dot notation)
+    :param value: location (tuple) or area (list)
+    :return: SQLAlchemy expression
+    """
+    if isinstance(column, str):
+        column = ref(column)
+    return as_geography(column).op('<->', return_type=Float)(
+        as_geography(as_geometry(value)))
+
+
+class SpatialOperator(FilterOperator):
+    """
+        Spatial dict filter value, e.g. {"school.location": DWithin(...)}
+        - Compiles to index friendly PostGIS predicates
+        - Resolved against (joined) LocationType or AreaType column
+    """
+
+    def clause(self, column):
+        """ Build PostGIS predicate for geometry column """
+        raise NotImplementedError()
+
+
+class DWithin(SpatialOperator):
+    """ Geometry within distance (meters) of location or area """
+
+    def __init__(self, value, meters):
+        assert isinstance(meters, (int, float)) and meters >= 0
+        self.value = value
+        self.meters = meters
+
+    def clause(self, column):
+        return func.ST_DWithin(
+            as_geography(column),
+            as_geography(as_geometry(self.value)),
+            self.meters
+        )
+
+
+class BBox(SpatialOperator):
+    """ Bounding box of geometry overlaps box (e.g. viewport) """
+
+    def __init__(self, min_lon, min_lat, max_lon, max_lat):
+        self.box = (
+            validate_longitude(min_lon), validate_latitude(min_lat),
+            validate_longitude(max_lon), validate_latitude(max_lat)
+        )
+
+    def clause(self, column):
+        return column.op('&&')(func.ST_MakeEnvelope(*self.box, SRID))
+
+
+class Contains(SpatialOperator):
+    """ Geometry contains location or area """
+
+    def __init__(self, value):
+        self.value = value
+
+    def clause(self, column):
+        return func.ST_Contains(column, as_geometry(self.value))
+
+
+class Intersects(SpatialOperator):
+    """ Geometry intersects location or area """
+
+    def __init__(self, value):
+        self.value = value
+
+    def clause(self, column):
+        return func.ST_Intersects(column, as_geometry(self.value))
+
+
+class Within(SpatialOperator):
+    """ Geometry is within area """
+
+    def __init__(self, area):
+        assert isinstance(area, list), area
+        self.value = area
+
+    def clause(self, column):
+        return func.ST_Within(column, as_geometry(self.value))
@@ -0,0 +1,46 @@
+import itertools
+from sqlalchemy import inspect
+
+# session info key storing names of tables changed in current transaction
+CHANGED_TABLES_KEY = "painless_changed_tables"
+
+
+def mark_changed(session, tables):
+    """
+        Mark tables as changed in current transaction of session.
+        Cached results are invalidated once the transaction is committed.
+    :param session: session (or connection) containing changes
+    :param tables: iterable of Table objects or table names
+    """
+    changed = session.info.setdefault(CHANGED_TABLES_KEY, set())
+    changed.update(getattr(t, 'fullname', t) for t in tables)
+
+
+def has_changes(session, mapper=None):
+    """
+        Check for changes that are not visible to other transactions
+        - Includes core statements executed on the session connection
+    :param mapper: mapper used to select session connection
+    :return True iff pending or flushed, uncommitted changes exist
+    """
+    return bool(
+        session.info.get(CHANGED_TABLES_KEY) or
+        session.new or session.dirty or session.deleted or
+        session.connection(mapper=mapper).info.get(CHANGED_TABLES_KEY)
+    )
+
+
+def mark_flushed(session):
+    """
+        Mark tables of objects that are about to be flushed as changed
+    :param session: session in pre-flush state
+    """
+    tables = []
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        mapper = inspect(obj).mapper
+        tables += mapper.tables
+        tables += [
+            r.secondary for r in mapper.relationships
+            if r.secondary is not None
+        ]
+    mark_changed(session, tables)
@@ -0,0 +1,103 @@
+import csv
+import json
+import uuid
+import decimal
+import datetime
+
+# amount of characters buffered per read of the copy stream
+COPY_BUFFER_SIZE = 65536
+
+# types encoded using their string representation
+TEXT_TYPES = (
+    str, int, float, decimal.Decimal, uuid.UUID,
+    datetime.date, datetime.time
+)
+
+
+def _encode_array(value):
+    """ Encode list or tuple as postgres array literal, e.g. {"1","2"} """
+    items = []
+    for v in value:
+        if v is None:
+            items.append("NULL")
+        elif isinstance(v, (list, tuple)):
+            items.append(_encode_array(v))
+        else:
+            text = _encode_text(v).replace('\\', '\\\\').replace('"', '\\"')
+            items.append('"%s"' % text)
+    return "{%s}" % ",".join(items)
+
+
+def _encode_text(value):
+    """ Encode value as postgres text input, raises TypeError if unknown """
+    value = getattr(value, 'adapted', value)  # psycopg2 adapter (Binary)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return _encode_array(value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, TEXT_TYPES):
+        return str(value)
+    raise TypeError("Can not encode %s for COPY." % type(value).__name__)
+
+
+def encode_value(value):
+    """
+        Encode value as csv field for COPY
+        - None is encoded as NULL (unquoted empty field)
+        - Everything else is quoted, so empty strings are preserved
+        - Bytes are encoded as hex (bytea), lists and tuples as array
+        literal and dicts as json
+        - Other unsupported types raise TypeError
+    :param value: processed value (see bind_processor)
+    :return: csv field
+    """
+    if value is None:
+        return ""
+    return '"%s"' % _encode_text(value).replace('"', '""')
+
+
+def read_csv(file):
+    """
+        Read csv file with header as dicts
+        - Empty fields are considered None
+    :param file: readable file like object
+    :return: generator of dicts mapping header to values
+    """
+    for row in csv.DictReader(file):
+        yield {k: (None if v == "" else v) for k, v in row.items()}
+
+
+class CopyStream():
+    """
+        File like object encoding rows as csv for COPY FROM STDIN
+        - Rows are only encoded when read, so memory usage is bounded
+    """
+
+    def __init__(self, rows, encode_row):
+        """
+        :param rows: iterable of rows
+        :param encode_row: function returning list of csv fields for row
+        """
+        self.count = 0
+        self._rows = iter(rows)
+        self._encode_row = encode_row
+        self._buffer = ""
+
+    def read(self, size=-1):
+        """ Read up to size characters (all if negative) """
+        chunks, length = [self._buffer], len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = ",".join(self._encode_row(row)) + "\n"
+            chunks.append(line)
+            length += len(line)
+            self.count += 1
+        data = "".join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
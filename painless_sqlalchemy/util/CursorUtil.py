@@ -0,0 +1,35 @@
+import json
+import base64
+import datetime as dt
+
+
+def _encode_value(value):
+    """ Json encode values that are not natively supported """
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    """
+        Encode values into opaque, url safe cursor
+    :param values: list of json serializable values
+    :return: the cursor
+    """
+    data = json.dumps(list(values), default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+        Decode opaque cursor into values. Throws error if invalid.
+    :param cursor: cursor as returned from encode_cursor
+    :return: list of values
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (AttributeError, ValueError) as err:
+        raise ValueError("Invalid cursor given.", err)
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor given.")
+    return values
@@ -1,4 +1,17 @@
-from math import radians, cos, sin, asin, sqrt, isnan, isinf
+import heapq
+import itertools
+from math import (
+    radians, degrees, cos, sin, asin, sqrt, floor, ceil, isnan, isinf)
+try:  # optional, required for batch functions
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# mean earth radius in m
+EARTH_RADIUS = 6371 * 1000
+
+# maximum amount of distances computed at once for distance matrix
+MATRIX_CHUNK_SIZE = 2 ** 20
 
 
 def _validate_coordinate(coordinate, valid_range):
@@ -72,8 +85,113 @@ def haversine(lon1, lat1, lon2, lat2):
     dlat = lat2 - lat1
     a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
     c = 2 * asin(sqrt(a))
-    r = 6371 * 1000
-    return c * r
+    return c * EARTH_RADIUS
+
+
+def _as_array(locations):
+    """
+        Convert locations to numpy array
+    :param locations: array like of (longitude, latitude)
+    :return: numpy array of shape (len, 2)
+    """
+    if numpy is None:  # pragma: no cover
+        raise ImportError("Batch functions require numpy.")
+    locations = numpy.asarray(locations, dtype=float)
+    if locations.size == 0:
+        locations = locations.reshape(0, 2)
+    assert locations.ndim == 2 and locations.shape[1] == 2, locations.shape
+    return locations
+
+
+def _as_radians(locations):
+    """
+        Convert locations to radians
+    :param locations: array like of (longitude, latitude)
+    :return: tuple (longitudes, latitudes) as numpy arrays in radians
+    """
+    locations = numpy.radians(_as_array(locations))
+    return locations[:, 0], locations[:, 1]
+
+
+def _haversine_radians(lon1, lat1, lon2, lat2, cos_lat1=None, cos_lat2=None):
+    """ Haversine for (broadcast) numpy arrays in radians """
+    if cos_lat1 is None:
+        cos_lat1 = numpy.cos(lat1)
+    if cos_lat2 is None:
+        cos_lat2 = numpy.cos(lat2)
+    a = (
+        numpy.sin((lat2 - lat1) / 2) ** 2 +
+        cos_lat1 * cos_lat2 * numpy.sin((lon2 - lon1) / 2) ** 2
+    )
+    # clip rounding errors for antipodal points
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1)))
+
+
+def haversine_many(location, locations):
+    """
+        Calculate distances from one location to many locations.
+        Vectorized version of haversine (requires numpy).
+    :param location: (longitude, latitude)
+    :param locations: array like of (longitude, latitude)
+    :return: numpy array of distances in m
+    """
+    lon1, lat1 = _as_radians([location])
+    lon2, lat2 = _as_radians(locations)
+    return _haversine_radians(lon1, lat1, lon2, lat2)
+
+
+def haversine_pairwise(locations1, locations2):
+    """
+        Calculate distances between locations of same index.
+        Vectorized version of haversine (requires numpy).
+    :param locations1: array like of (longitude, latitude)
+    :param locations2: array like of (longitude, latitude), same length
+    :return: numpy array of distances in m
+    """
+    lon1, lat1 = _as_radians(locations1)
+    lon2, lat2 = _as_radians(locations2)
+    assert lon1.shape == lon2.shape, (lon1.shape, lon2.shape)
+    return _haversine_radians(lon1, lat1, lon2, lat2)
+
+
+def iter_haversine_matrix(locations1, locations2, chunk_size=None):
+    """
+        Calculate distance matrix in chunks of rows.
+        Memory is bounded by chunk size (requires numpy).
+    :param locations1: array like of (longitude, latitude), matrix rows
+    :param locations2: array like of (longitude, latitude), matrix columns
+    :param chunk_size: maximum amount of distances per chunk,
+    defaults to MATRIX_CHUNK_SIZE
+    :return: generator of (row offset, numpy array of shape (rows, columns))
+    """
+    if chunk_size is None:
+        chunk_size = MATRIX_CHUNK_SIZE
+    assert isinstance(chunk_size, int) and chunk_size > 0
+    lon1, lat1 = _as_radians(locations1)
+    lon2, lat2 = _as_radians(locations2)
+    cos_lat1, cos_lat2 = numpy.cos(lat1), numpy.cos(lat2)
+    rows = max(1, chunk_size // max(1, len(lon2)))
+    for offset in range(0, len(lon1), rows):
+        chunk = slice(offset, offset + rows)
+        yield offset, _haversine_radians(
+            lon1[chunk, None], lat1[chunk, None], lon2, lat2,
+            cos_lat1[chunk, None], cos_lat2)
+
+
+def haversine_matrix(locations1, locations2, chunk_size=None):
+    """
+        Calculate distances between all locations (requires numpy).
+        Computed in chunks to bound memory of intermediate results.
+    :param locations1: array like of (longitude, latitude), matrix rows
+    :param locations2: array like of (longitude, latitude), matrix columns
+    :param chunk_size: see iter_haversine_matrix
+    :return: numpy array of distances in m, shape (len 1, len 2)
+    """
+    result = numpy.empty((len(locations1), len(locations2)))
+    for offset, chunk in iter_haversine_matrix(
+            locations1, locations2, chunk_size):
+        result[offset:offset + len(chunk)] = chunk
+    return result
 
 
 def point_inside_polygon(x, y, poly):
@@ -109,3 +227,276 @@ def point_inside_polygon(x, y, poly):
         p1x, p1y = p2x, p2y
 
     return inside
+
+
+def _points_inside_edges(x, y, edges):
+    """
+        Vectorized crossing test, see point_inside_polygon
+    :param x: numpy array of point x coordinates
+    :param y: numpy array of point y coordinates
+    :param edges: tuple (x1, y1, x2, y2) of numpy arrays
+    :return: numpy bool array, true iff point is inside
+    """
+    x1, y1, x2, y2 = edges
+    result = numpy.empty(len(x), dtype=bool)
+    rows = max(1, MATRIX_CHUNK_SIZE // max(1, len(x1)))
+    for offset in range(0, len(x), rows):
+        px = x[offset:offset + rows, None]
+        py = y[offset:offset + rows, None]
+        straddles = (y1 > py) != (y2 > py)
+        # Note: straddling edges can not be horizontal (no division by zero)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            crossing = px < (x2 - x1) * (py - y1) / (y2 - y1) + x1
+        result[offset:offset + rows] = numpy.count_nonzero(
+            straddles & crossing, axis=1) % 2 == 1
+    return result
+
+
+class PolygonIndex():
+    """
+        In-memory index for batch point in polygon tests (requires numpy)
+        - Polygons are registered in grid cells overlapping their bounding box
+        - Points are only tested against polygons of their grid cell with
+        bounding box containing them
+        - Crossing test is vectorized (same semantics as point_inside_polygon)
+    """
+
+    def __init__(self, polygons, cell_size=None):
+        """
+        :param polygons: list of polygons as returned for Area columns,
+        i.e. closed lists of (longitude, latitude). None entries never match
+        :param cell_size: grid cell size in degrees, defaults to median
+        bounding box size
+        """
+        assert cell_size is None or cell_size > 0
+        self._bboxes = {}
+        self._edges = {}
+        for i, polygon in enumerate(polygons):
+            if polygon is None:
+                continue
+            points = _as_array(polygon)
+            assert len(points) > 0 and tuple(points[0]) == tuple(points[-1])
+            self._bboxes[i] = (*points.min(axis=0), *points.max(axis=0))
+            self._edges[i] = (
+                points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+
+        if cell_size is None:
+            sizes = [
+                max(b[2] - b[0], b[3] - b[1]) for b in self._bboxes.values()]
+            cell_size = float(numpy.median(sizes)) if sizes else 1.0
+        self.cell_size = max(cell_size, 1e-9)
+
+        self._grid = {}
+        for i, (min_x, min_y, max_x, max_y) in self._bboxes.items():
+            for cell_x in range(self._cell(min_x), self._cell(max_x) + 1):
+                for cell_y in range(self._cell(min_y), self._cell(max_y) + 1):
+                    self._grid.setdefault((cell_x, cell_y), []).append(i)
+
+    def _cell(self, coordinate):
+        """ Grid cell for coordinate """
+        return int(numpy.floor(coordinate / self.cell_size))
+
+    def query(self, locations):
+        """
+            Find polygons containing locations
+        :param locations: array like of (longitude, latitude)
+        :return: list with sorted list of polygon indices per location
+        """
+        locations = _as_array(locations)
+        result = [[] for _ in range(len(locations))]
+        if len(locations) == 0:
+            return result
+        x, y = locations[:, 0], locations[:, 1]
+        # group locations by grid cell
+        cells = numpy.floor(locations / self.cell_size).astype(numpy.int64)
+        cells, inverse = numpy.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = numpy.argsort(inverse, kind='stable')
+        ends = numpy.cumsum(numpy.bincount(inverse, minlength=len(cells)))
+        start = 0
+        for cell, end in zip(map(tuple, cells.tolist()), ends.tolist()):
+            members, start = order[start:end], end
+            px, py = x[members], y[members]
+            for i in self._grid.get(cell, ()):
+                min_x, min_y, max_x, max_y = self._bboxes[i]
+                candidates = members[
+                    (px >= min_x) & (px <= max_x) & (py >= min_y) & (py <= max_y)
+                ]
+                inside = _points_inside_edges(
+                    x[candidates], y[candidates], self._edges[i])
+                for point in candidates[inside].tolist():
+                    result[point].append(i)
+        return result
+
+
+class PointIndex():
+    """
+        In-memory index for nearest and radius queries on locations
+        - Locations are stored in grid cells of cell_size degrees
+        - Queries only visit cells that can contain results
+        - Distances are computed using haversine
+        - Supports incremental inserts and removals
+    """
+
+    def __init__(self, locations=None, cell_size=0.1):
+        """
+        :param locations: dict of key to location or list of locations as
+        returned for Location columns (keys are list indices)
+        :param cell_size: grid cell size in degrees
+        """
+        assert 0 < cell_size <= 90
+        self.cell_size = cell_size
+        # cells evenly divide the globe (longitude wraps)
+        self._lon_cells = int(ceil(360 / cell_size))
+        self._lat_cells = int(ceil(180 / cell_size))
+        self._lon_size = 360 / self._lon_cells
+        self._lat_size = 180 / self._lat_cells
+        self._cells = {}
+        self._locations = {}
+        if isinstance(locations, list):
+            locations = dict(enumerate(locations))
+        for key, location in (locations or {}).items():
+            self.insert(key, location)
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    def _cell(self, location):
+        """ Grid cell (x, y) for location """
+        return (
+            int(floor((location[0] + 180) / self._lon_size)) % self._lon_cells,
+            min(int(floor((location[1] + 90) / self._lat_size)),
+                self._lat_cells - 1)
+        )
+
+    def insert(self, key, location):
+        """ Insert or move location for key, None locations are ignored """
+        self.remove(key)
+        if location is None:
+            return
+        location = validate_longlat(location)
+        cell = self._cell(location)
+        self._locations[key] = (location, cell)
+        self._cells.setdefault(cell, {})[key] = location
+
+    def remove(self, key):
+        """ Remove location for key (if present) """
+        entry = self._locations.pop(key, None)
+        if entry is not None:
+            cell = self._cells[entry[1]]
+            del cell[key]
+            if not cell:
+                del self._cells[entry[1]]
+
+    def _visit(self, location, cells):
+        """ Yield (distance, key) for all entries in cells """
+        for cell in cells:
+            for key, loc in self._cells.get(cell, {}).items():
+                yield haversine(location[0], location[1], loc[0], loc[1]), key
+
+    def radius(self, location, meters):
+        """
+            Find all locations within distance
+        :param location: (longitude, latitude)
+        :param meters: maximum distance in m
+        :return: list of (key, distance) ordered by distance
+        """
+        assert meters >= 0
+        location = validate_longlat(location)
+        angle = meters / EARTH_RADIUS
+        delta_lat = degrees(angle)
+        min_y = max(int(floor((location[1] - delta_lat + 90) / self._lat_size)), 0)
+        max_y = min(
+            int(floor((location[1] + delta_lat + 90) / self._lat_size)),
+            self._lat_cells - 1)
+        xs = range(self._lon_cells)
+        if (
+                abs(location[1]) + delta_lat < 90 and
+                sin(angle) < cos(radians(location[1]))
+        ):  # longitude extent of spherical cap
+            delta_lon = degrees(asin(sin(angle) / cos(radians(location[1]))))
+            min_x = int(floor((location[0] - delta_lon + 180) / self._lon_size))
+            max_x = int(floor((location[0] + delta_lon + 180) / self._lon_size))
+            if max_x - min_x + 1 < self._lon_cells:
+                xs = [x % self._lon_cells for x in range(min_x, max_x + 1)]
+        if len(xs) * (max_y - min_y + 1) > len(self._cells):
+            cells = list(self._cells)
+        else:
+            cells = [(x, y) for x in xs for y in range(min_y, max_y + 1)]
+        return [
+            (key, distance) for distance, key in sorted(
+                (e for e in self._visit(location, cells) if e[0] <= meters),
+                key=lambda e: e[0])
+        ]
+
+    def _ring(self, cell, ring):
+        """ Cells with chebyshev distance ring to cell (wrapping longitude) """
+        result = set()
+        for dy in range(-ring, ring + 1):
+            y = cell[1] + dy
+            if 0 <= y < self._lat_cells:
+                step = 1 if abs(dy) == ring else 2 * ring
+                for dx in range(-ring, ring + 1, max(step, 1)):
+                    result.add(((cell[0] + dx) % self._lon_cells, y))
+        return result
+
+    def _ring_bound(self, location, cell, ring):
+        """ Lower bound for distance of locations outside of ring """
+        lower = (cell[1] - ring) * self._lat_size - 90
+        upper = (cell[1] + ring + 1) * self._lat_size - 90
+        gap_lat = min(
+            location[1] - lower if cell[1] - ring > 0 else float('inf'),
+            upper - location[1] if cell[1] + ring < self._lat_cells - 1
+            else float('inf'))
+        bound = radians(gap_lat) * EARTH_RADIUS
+        if 2 * ring + 1 < self._lon_cells:
+            west = (cell[0] - ring) * self._lon_size - 180
+            east = (cell[0] + ring + 1) * self._lon_size - 180
+            gap_lon = min(location[0] - west, east - location[0], 90)
+            # distance to closest meridian bounding ring
+            bound = min(bound, EARTH_RADIUS * asin(
+                cos(radians(location[1])) * sin(radians(gap_lon))))
+        return bound
+
+    def knn(self, location, k):
+        """
+            Find k nearest locations
+        :param location: (longitude, latitude)
+        :param k: maximum amount of results
+        :return: list of (key, distance) ordered by distance
+        """
+        assert isinstance(k, int) and k >= 0
+        location = validate_longlat(location)
+        if k == 0:
+            return []
+        cell = self._cell(location)
+        counter = itertools.count()  # tiebreaker, keys are not comparable
+        best, visited = [], set()
+        for ring in itertools.count():
+            # visit remaining cells directly once searched area exceeds them
+            final = (
+                2 * ring + 1 >= self._lon_cells or
+                (2 * ring + 1) ** 2 > len(self._cells) - len(visited)
+            )
+            if final:
+                cells = set(self._cells) - visited
+            else:
+                cells = set(
+                    c for c in self._ring(cell, ring) if c in self._cells)
+            visited |= cells
+            for distance, key in self._visit(location, cells):
+                entry = (-distance, next(counter), key)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+            if final or (
+                    len(best) == k and
+                    -best[0][0] <= self._ring_bound(location, cell, ring)
+            ):
+                break
+        return [(key, -distance) for distance, _, key in sorted(
+            best, key=lambda e: (-e[0], e[1]))]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Table
+from sqlalchemy import Column, ForeignKey, Integer, Table, Index
 from sqlalchemy.dialects import postgresql
 from painless_sqlalchemy.core.Model import Model
 
@@ -29,3 +29,18 @@ def many_to_many(from_col, to_col, from_uuid=False, to_uuid=False,
     if extra_cols is not None:
         data += extra_cols
     return Table(*data)
+
+
+def gist_index(column, geography=False, name=None):
+    """
+        Generate GiST index for LocationType or AreaType column
+        - Use geography=True to index DWithin filters (distances in meters)
+        - Index is created with the table when column is bound to a table
+    """
+    # Note: imported here, since geoalchemy2 is an optional dependency
+    from painless_sqlalchemy.elements.SpatialOperator import as_geography
+    if name is None:
+        name = "ix_%s_%s_%s" % (
+            column.table.name, column.name, "geog" if geography else "gist")
+    expression = as_geography(column) if geography else column
+    return Index(name, expression, postgresql_using='gist')
@@ -30,7 +30,8 @@ setup(
         'psycopg2-binary>=2.7'
     ],
     extras_require={
-        'postgis': ["GeoAlchemy2>=0.4.2"]
+        'postgis': ["GeoAlchemy2>=0.4.2"],
+        'numpy': ["numpy>=1.13"]
     },
     keywords=['SQLAlchemy', 'Serialization', 'Query', 'Simple', 'Abstraction', 'PostGis', 'Columns'],
     classifiers=[]
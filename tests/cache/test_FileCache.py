@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from painless_sqlalchemy.cache.FileCache import FileCache
+
+
+class TestFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_set(self):
+        cache = FileCache(self.directory)
+        key = cache.get_key("query", [('id', 1)])
+        versions = cache.get_versions(('student',))
+        assert cache.get(key, versions) is None
+        cache.set(key, versions, [{'id': 1}])
+        assert cache.get(key, versions) == [{'id': 1}]
+
+    def test_shared(self):
+        cache1 = FileCache(self.directory)
+        cache2 = FileCache(self.directory)
+        versions = cache1.get_versions(('student',))
+        cache1.set("key", versions, [{'id': 1}])
+        assert cache2.get("key", cache2.get_versions(('student',))) == [{'id': 1}]
+        cache2.invalidate(['student'])
+        assert cache1.get("key", cache1.get_versions(('student',))) is None
+
+    def test_lru(self):
+        cache = FileCache(self.directory, max_size=2)
+        versions = cache.get_versions(())
+        cache.set("a", versions, 1)
+        cache.set("b", versions, 2)
+        os.utime(os.path.join(cache.entry_dir, "a"), (0, 0))
+        cache.set("c", versions, 3)
+        assert cache.get("a", versions) is None
+        assert cache.get("b", versions) == 2
+        assert cache.get("c", versions) == 3
+
+    def test_lru_lazy(self):
+        cache = FileCache(self.directory, max_size=20)
+        versions = cache.get_versions(())
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            for i in range(40):
+                cache.set(str(i), versions, i)
+        # initial scan, then eviction to 18 entries every 3 writes
+        assert scandir.call_count == 8
+        assert len(os.listdir(cache.entry_dir)) == 19
+        assert cache.get("39", versions) == 39
+
+    def test_private(self):
+        directory = os.path.join(self.directory, "cache")
+        cache = FileCache(directory)
+        for path in (directory, cache.entry_dir, cache.version_dir):
+            assert os.stat(path).st_mode & 0o777 == 0o700
+
+    def test_clear(self):
+        cache = FileCache(self.directory)
+        versions = cache.get_versions(())
+        cache.set("key", versions, 1)
+        cache.clear()
+        assert cache.get("key", versions) is None
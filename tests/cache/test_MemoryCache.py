@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+from painless_sqlalchemy.cache.MemoryCache import MemoryCache
+
+
+class TestMemoryCache(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = MemoryCache()
+        key = cache.get_key("query", [('id', 1)])
+        versions = cache.get_versions(('student',))
+        assert cache.get(key, versions) is None
+        cache.set(key, versions, [{'id': 1}])
+        assert cache.get(key, versions) == [{'id': 1}]
+
+    def test_returns_copy(self):
+        cache = MemoryCache()
+        versions = cache.get_versions(('student',))
+        cache.set("key", versions, [{'id': 1}])
+        cache.get("key", versions)[0]['id'] = 2
+        assert cache.get("key", versions) == [{'id': 1}]
+
+    def test_invalidate(self):
+        cache = MemoryCache()
+        versions = cache.get_versions(('student', 'teacher'))
+        cache.set("key", versions, [])
+        cache.invalidate(['school'])
+        assert cache.get("key", cache.get_versions(('student', 'teacher'))) == []
+        cache.invalidate(['teacher'])
+        versions_new = cache.get_versions(('student', 'teacher'))
+        assert versions != versions_new
+        assert cache.get("key", versions_new) is None
+
+    def test_lru(self):
+        cache = MemoryCache(max_size=2)
+        versions = cache.get_versions(())
+        cache.set("a", versions, 1)
+        cache.set("b", versions, 2)
+        assert cache.get("a", versions) == 1
+        cache.set("c", versions, 3)
+        assert cache.get("b", versions) is None
+        assert cache.get("a", versions) == 1
+        assert cache.get("c", versions) == 3
+
+    def test_ttl(self):
+        cache = MemoryCache(ttl=10)
+        versions = cache.get_versions(())
+        with mock.patch("time.time", return_value=1000):
+            cache.set("key", versions, 1)
+        with mock.patch("time.time", return_value=1005):
+            assert cache.get("key", versions) == 1
+        with mock.patch("time.time", return_value=1011):
+            assert cache.get("key", versions) is None
+
+    def test_clear(self):
+        cache = MemoryCache()
+        versions = cache.get_versions(())
+        cache.set("key", versions, 1)
+        cache.clear()
+        assert cache.get("key", versions) is None
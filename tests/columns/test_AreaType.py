@@ -1,3 +1,4 @@
+import json
 import pytest
 from faker import Faker
 from tests.AbstractTest import AbstractTest
@@ -26,6 +27,14 @@ class TestAreaType(AbstractTest):
         assert school.area == area
         school.update(area=None).save()
 
+    def test_serialize_json(self, School):
+        area = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+        school = School.filter().one()
+        school.update(area=area).save()
+        assert json.loads(School.serialize_json(to_return=['area'])) == json.loads(
+            json.dumps(School.serialize(to_return=['area'])))
+        school.update(area=None).save()
+
     def test_invalid_poly(self, School):
         school = School.filter().one()
         with pytest.raises(ValueError) as e:
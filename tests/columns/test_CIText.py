@@ -9,14 +9,16 @@ class TestCIText(AbstractTest):
 
     @classmethod
     @pytest.fixture(scope='class', autouse=True)
-    def setup_class(cls, Student):
+    def setup_class(cls, Student, Teacher):
         super(TestCIText, cls).setup_class()
         cls.email_upper = fake.email().upper()
         student = Student(name=fake.name(), email=cls.email_upper)
+        teacher = Teacher(name=fake.name(), nickname="MiXeD Case")
 
-        cls.checkin(student)
+        cls.checkin(student, teacher)
 
         cls.student = cls.persist(student)
+        cls.teacher = cls.persist(teacher)
 
     def test_always_lower(self, Student):
         student = Student.filter().one()
@@ -28,3 +30,16 @@ class TestCIText(AbstractTest):
     def test_query_by_upper(self, Student):
         student = Student.filter({"email": self.email_upper}).one()
         assert student.email == student.email.lower()
+
+    def test_query_list_mixed_case(self, Teacher):
+        values = ["mixed case", "OTHER", "other"]
+        for array, unnest in [(64, 4096), (2, 4096), (2, 3)]:
+            Teacher.array_filter_threshold = array
+            Teacher.unnest_filter_threshold = unnest
+            try:
+                teacher = Teacher.filter({"nickname": values}).one()
+                assert teacher.id == self.teacher.id
+                assert teacher.nickname == "MiXeD Case"
+            finally:
+                del Teacher.array_filter_threshold
+                del Teacher.unnest_filter_threshold
@@ -1,3 +1,4 @@
+import json
 import pytest
 from faker import Faker
 from tests.AbstractTest import AbstractTest
@@ -27,6 +28,14 @@ class TestHexColorType(AbstractTest):
         assert classroom.color == color
         classroom.update(color=None).save()
 
+    def test_serialize_json(self, Classroom):
+        color = "#0A77FF"
+        classroom = Classroom.filter().one()
+        classroom.update(color=color).save()
+        assert json.loads(Classroom.serialize_json(to_return=['color'])) == json.loads(
+            json.dumps(Classroom.serialize(to_return=['color'])))
+        classroom.update(color=None).save()
+
     def test_invalid(self, Classroom):
         classroom = Classroom.filter().one()
         with pytest.raises(ValueError) as e:
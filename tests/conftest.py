@@ -49,6 +49,7 @@ def School():
             primaryjoin='School.id == Classroom.school_id'
         )
 
+    TableUtil.gist_index(School.__table__.c.location, geography=True)
     return School
 
 
@@ -80,6 +81,7 @@ def Teacher(Classroom):
         __tablename__ = 'teacher'
 
         name = Column(String(64), index=True, nullable=False)
+        nickname = Column(CIText(64, False), nullable=True)
 
         classroom_id = Column(Integer, ForeignKey(Classroom.id), unique=True)
         classroom = relationship(
@@ -1,6 +1,8 @@
+import io
 import pytest
 from sqlalchemy.exc import IntegrityError
 from faker import Faker
+from painless_sqlalchemy.elements.SpatialOperator import DWithin
 from tests.AbstractTest import AbstractTest
 
 fake = Faker()
@@ -10,7 +12,7 @@ class TestModelAction(AbstractTest):
 
     @classmethod
     @pytest.fixture(scope='class', autouse=True)
-    def setup_class(cls, Teacher, Student):
+    def setup_class(cls, School, Teacher, Student):
         super(TestModelAction, cls).setup_class()
         student = Student(name=fake.name())
         teacher = Teacher(name=fake.name())
@@ -65,3 +67,197 @@ class TestModelAction(AbstractTest):
         assert Student.filter({
             'id': student.id
         }).one().name == self.student.name
+
+    def test_bulk_create(self, Student):
+        names = [fake.name() for _ in range(5)]
+        rows = [{'name': name} for name in names]
+        rows[1]['email'] = "Mixed@Case.com"
+        ids = Student.bulk_create(rows, return_ids=True, batch_size=2)
+        self.register(student=tuple(ids))
+        assert len(set(ids)) == 5
+        for id_, name in zip(ids, names):
+            assert Student.filter({'id': id_}).one().name == name
+        assert Student.filter({'id': ids[1]}).one().email == "mixed@case.com"
+        # explicit ids are kept, others are allocated from sequence
+        new_id = 1000000 + fake.random_int()
+        ids = Student.bulk_create(
+            [{'name': names[0]}, {'id': new_id, 'name': names[1]}] +
+            [{'name': name} for name in names[2:]], return_ids=True)
+        self.register(student=tuple(ids))
+        assert ids[1] == new_id
+        for id_, name in zip(ids, names):
+            assert Student.filter({'id': id_}).one().name == name
+
+    def test_bulk_create_count(self, Student, School):
+        name = fake.name()
+        assert Student.bulk_create([{'name': name}] * 3) == 3
+        ids = [s.id for s in Student.filter({'name': name}).all()]
+        self.register(student=tuple(ids))
+        assert len(ids) == 3
+        assert Student.bulk_create([]) == 0
+        ids = School.bulk_create([{}, {'location': (10, 20)}], return_ids=True)
+        self.register(school=tuple(ids))
+        assert School.filter({'id': ids[1]}).one().location == (10, 20)
+
+    def test_bulk_create_invalid(self, Student, School):
+        with pytest.raises(ValueError):
+            School.bulk_create([{'location': (200, 0)}])
+        with pytest.raises(AttributeError):
+            Student.bulk_create([{'first_name': fake.name()}])
+        with pytest.raises(AttributeError):
+            Student.bulk_create([{'invalid_column': None}])
+
+    def test_copy_from(self, Student, School):
+        name = fake.name()
+        rows = [
+            {'name': name, 'address': '', 'email': 'A@B.com'},
+            {'name': name, 'address': 'a "quoted", address', 'email': None},
+            {'name': name, 'address': None, 'email': None}
+        ]
+        assert Student.copy_from(iter(rows), buffer_size=16) == 3
+        result = Student.serialize(
+            to_return=['id', 'address', 'email'], filter_by={'name': name},
+            expose_all=True)
+        self.register(student=tuple(r['id'] for r in result))
+        assert [{k: v for k, v in r.items() if k != 'id'} for r in result] == [
+            {'address': '', 'email': 'a@b.com'},
+            {'address': 'a "quoted", address', 'email': None},
+            {'address': None, 'email': None}
+        ]
+        location = (fake.longitude(), fake.latitude())
+        location = (float(location[0]), float(location[1]))
+        assert School.copy_from([{
+            'location': location, 'timezone': 'UTC', 'opening': '08:30',
+            'area': [(0, 0), (0, 1), (1, 1), (0, 0)]
+        }]) == 1
+        school = School.filter({'location': DWithin(location, 1)}).one()
+        self.register(school=school.id)
+        assert school.location == location
+        assert school.opening == '08:30'
+        assert school.timezone == 'UTC'
+        assert Student.copy_from([]) == 0
+
+    def test_copy_from_csv(self, Student, School):
+        name = fake.name()
+        data = 'name,address\n"%s",""\n"%s",\n' % (name, name)
+        assert Student.copy_from(io.StringIO(data)) == 2
+        students = Student.filter({'name': name}).all()
+        self.register(student=tuple(s.id for s in students))
+        assert [s.address for s in students] == [None, None]
+        assert School.copy_from(io.StringIO(
+            'location,opening\n"[10.5, 20.5]",09:00\n')) == 1
+        school = School.filter({'location': DWithin((10.5, 20.5), 1)}).one()
+        self.register(school=school.id)
+        assert school.opening == '09:00'
+
+    def test_copy_from_invalid(self, Student, School):
+        name = fake.name()
+        with pytest.raises(ValueError):
+            School.copy_from(io.StringIO('location\n"[1, 200]"\n'))
+        with pytest.raises(AttributeError):
+            Student.copy_from([{'first_name': name}])
+        with pytest.raises(ValueError):
+            Student.copy_from([{'name': name}, {'name': name, 'phone': None}])
+        assert Student.filter({'name': name}).count() == 0
+
+    def test_upsert(self, Student):
+        new_id = 1000000 + fake.random_int()
+        name = fake.name()
+        ids = Student.upsert([
+            {'id': self.student.id, 'name': name},
+            {'id': new_id, 'name': name},
+            {'id': new_id, 'name': name, 'address': 'address'}
+        ])
+        self.register(student=new_id)
+        assert ids == [self.student.id, new_id, new_id]
+        assert Student.filter({'id': self.student.id}).one().name == name
+        student = Student.filter({'id': new_id}).one()
+        assert (student.name, student.address) == (name, 'address')
+        # only update given columns
+        assert Student.upsert(
+            [{'id': new_id, 'name': fake.name(), 'address': None}],
+            update=('address',)) == [new_id]
+        student = Student.filter({'id': new_id}).one()
+        assert (student.name, student.address) == (name, None)
+        assert Student.upsert(
+            [{'id': new_id, 'name': fake.name()}], update=()) == [new_id]
+        assert Student.filter({'id': new_id}).one().name == name
+        # ids match rows independent of returned order
+        new_ids = [new_id + 3, new_id + 2, new_id + 1, self.student.id]
+        self.register(student=tuple(new_ids[:3]))
+        assert Student.upsert([{'id': i, 'name': name} for i in new_ids]) == new_ids
+        # revert
+        Student.upsert([{'id': self.student.id, 'name': self.student.name}])
+
+    def test_upsert_invalid(self, Student, School):
+        with pytest.raises(ValueError):
+            School.upsert([{'id': self.student.id, 'location': (200, 0)}])
+        with pytest.raises(ValueError):
+            Student.upsert([{'name': fake.name()}])
+        with pytest.raises(AttributeError):
+            Student.upsert([{'id': 1, 'name': fake.name()}], update=('invalid',))
+        with pytest.raises(ValueError):
+            Student.upsert([{'id': None, 'name': fake.name()}])
+
+    def test_update_where(self, Student, Teacher):
+        name = fake.name()
+        ids = Student.bulk_create(
+            [{'name': name}, {'name': name}], return_ids=True)
+        self.register(student=tuple(ids))
+        assert Student.update_where(
+            {'name': name}, {'email': 'A@B.com'}) == 2
+        assert [s.email for s in Student.filter({'name': name}).all()] == [
+            'a@b.com', 'a@b.com']
+        # to-many relationship (EXISTS)
+        teacher = Teacher(
+            name=fake.name(), students=[Student.filter({'id': ids[0]}).one()])
+        self.checkin(teacher)
+        assert Student.update_where(
+            {'teachers.id': teacher.id}, {'address': 'address'}) == 1
+        assert Student.filter({'id': ids[0]}).one().address == 'address'
+        assert Student.filter({'id': ids[1]}).one().address is None
+        # to-one relationship (joined subquery)
+        assert Teacher.update_where(
+            {'classroom.id': None, 'id': teacher.id}, {'name': name}) == 1
+        assert Teacher.filter({'id': teacher.id}).one().name == name
+        assert Student.update_where({'name': fake.name()}, {'phone': ''}) == 0
+
+    def test_update_where_invalid(self, School, Student):
+        with pytest.raises(ValueError):
+            School.update_where({'id': 0}, {'location': (200, 0)})
+        with pytest.raises(AttributeError):
+            Student.update_where({'id': 0}, {'first_name': fake.name()})
+
+    def test_update_where_all(self, Student):
+        with pytest.raises(ValueError):
+            Student.update_where({}, {'address': None})
+        with pytest.raises(ValueError):
+            Student.update_where(None, {'address': None})
+        count = Student.filter().count()
+        Student.session.begin_nested()  # commit only releases savepoint
+        assert Student.update_where(
+            {}, {'address': 'address'}, allow_all=True) == count
+        Student.session.rollback()
+
+    def test_delete_where(self, Student):
+        name = fake.name()
+        ids = Student.bulk_create(
+            [{'name': name}, {'name': name}, {'name': name}], return_ids=True)
+        self.register(student=tuple(ids))
+        assert Student.delete_where({'id': ids[:2], 'name': name}) == 2
+        assert [s.id for s in Student.filter({'name': name}).all()] == ids[2:]
+        assert Student.delete_where({'teachers.name': name}) == 0
+        assert Student.delete_where({'id': ids}) == 1
+        assert Student.filter({'name': name}).count() == 0
+
+    def test_delete_where_all(self, Student):
+        count = Student.filter().count()
+        with pytest.raises(ValueError):
+            Student.delete_where({})
+        with pytest.raises(ValueError):
+            Student.delete_where(None)
+        assert Student.filter().count() == count
+        Student.session.begin_nested()  # commit only releases savepoint
+        assert Student.delete_where({}, allow_all=True) == count
+        Student.session.rollback()
+        assert Student.filter().count() == count
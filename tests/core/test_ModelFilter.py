@@ -1,9 +1,11 @@
 import pytest
-from sqlalchemy import and_, or_, func, case, exists
+from sqlalchemy import and_, or_, func, case, exists, bindparam
 from sqlalchemy.dialects.postgresql import INTERVAL
 from sqlalchemy.orm import outerjoin
 from faker import Faker
 from painless_sqlalchemy.elements.ColumnReference import ref
+from painless_sqlalchemy.elements.SpatialOperator import (
+    DWithin, BBox, Contains, Intersects, Within)
 from tests.AbstractTest import AbstractTest
 
 fake = Faker()
@@ -23,7 +25,9 @@ class TestModelFilter(AbstractTest):
         teacher2 = Teacher(name=fake.name())
         classroom1 = Classroom(teacher=teacher1)
         classroom2 = Classroom(teacher=teacher2)
-        school = School(classrooms=[classroom1, classroom2])
+        school = School(
+            classrooms=[classroom1, classroom2], location=(10.0, 20.0),
+            area=[(0, 0), (0, 30), (30, 30), (30, 0), (0, 0)])
 
         cls.checkin(
             student1, student2, student3,
@@ -40,6 +44,18 @@ class TestModelFilter(AbstractTest):
         cls.classroom1 = cls.persist(classroom1)
         cls.school = cls.persist(school)
 
+    def test_path_graph_cached(self, Student):
+        graph = Student._iterate_path(['teachers', 'classroom', 'color'])
+        assert graph is Student._iterate_path(('teachers', 'classroom', 'color'))
+        assert [last for _, _, last in graph] == [False, False, True]
+        assert graph[-1][1] is Student._get_column(['teachers', 'classroom', 'color'])
+
+    def test_is_to_many(self, Student, Classroom):
+        assert Student._is_to_many(['teachers', 'classroom', 'color']) is True
+        assert Classroom._is_to_many(['teacher', 'classroom', 'color']) is False
+        assert Classroom._is_to_many(['teacher', 'students']) is False
+        assert Classroom._is_to_many(['teacher', 'students', 'name']) is True
+
     def test_filter_by_id(self, Teacher):
         assert Teacher.filter({
             'id': self.teacher1.id
@@ -250,3 +266,145 @@ class TestModelFilter(AbstractTest):
             "students.name": [fake.name(), fake.name()]
         })
         assert query._group_by == [Teacher.id]
+
+    def test_exists_strategy_equivalent(self, School, Teacher, Student):
+        for model, filter_by in [
+            (Teacher, {'students.name': self.student1.name}),
+            (Teacher, {'students.id': [self.student1.id, self.student2.id]}),
+            (Teacher, {'students.id': [self.student1.id, self.student3.id]}),
+            (Teacher, {'id': self.teacher1.id, 'students.id': []}),
+            (School, {'classrooms.teacher.id': self.teacher1.id}),
+            (School, {'classrooms.teacher.students.id': [self.student1.id, self.student2.id]}),
+            (Student, {'teachers.students.id': self.student2.id}),
+            (Student, {'teachers.id': None})
+        ]:
+            expected = sorted(e.id for e in model.filter(filter_by).all())
+            assert sorted(
+                e.id for e in model.filter(filter_by, strategy='exists').all()
+            ) == expected
+
+    def test_exists_strategy_no_join(self, Teacher):
+        query = Teacher.filter({
+            "students.id": [1, 2],
+            "students.name": [fake.name(), fake.name()]
+        }, strategy='exists')
+        assert query._group_by is False
+        assert "JOIN" not in str(query)
+        assert str(query).count("EXISTS") == 4
+
+    def test_filter_strategy_invalid(self, Teacher):
+        with pytest.raises(AssertionError):
+            Teacher.filter({"students.id": 1}, strategy='unknown')
+
+    def test_filter_list_array_parameter(self, Student, Teacher):
+        ids = [self.student1.id, self.student2.id, -1]
+        for array, unnest, sql_contains in [
+            (64, 4096, 'IN ('), (2, 4096, '= ANY ('), (2, 3, 'unnest(')
+        ]:
+            Student.array_filter_threshold = Teacher.array_filter_threshold = array
+            Student.unnest_filter_threshold = Teacher.unnest_filter_threshold = unnest
+            try:
+                query = Student.filter({'id': ids})
+                assert sql_contains in str(query)
+                assert sorted(s.id for s in query.all()) == sorted(ids[:2])
+                assert Teacher.filter({
+                    'students.id': ids[:2]
+                }).one().id == self.teacher1.id
+                assert Teacher.filter({'students.id': ids}).first() is None
+            finally:
+                del Student.array_filter_threshold, Teacher.array_filter_threshold
+                del Student.unnest_filter_threshold, Teacher.unnest_filter_threshold
+
+    def test_filter_does_not_modify_clause(self, Student):
+        clause = and_(
+            ref('teachers.name') == self.teacher1.name,
+            or_(ref('name') == self.student1.name, ref('name') == self.student2.name)
+        )
+        sql = str(clause)
+        assert len(Student.filter(clause).all()) == 2
+        assert str(clause) == sql
+        assert len(Student.filter(clause).all()) == 2
+
+    def test_filter_template(self, Student):
+        template = Student.filter_template(and_(
+            ref('teachers.name') == bindparam('teacher_name'),
+            ref('name') == bindparam('name')
+        ))
+        for student in [self.student1, self.student2]:
+            assert Student.filter(template).params(
+                teacher_name=self.teacher1.name, name=student.name
+            ).one().id == student.id
+        assert Student.filter(template).params(
+            teacher_name=self.teacher2.name, name=self.student1.name
+        ).first() is None
+
+    def test_filter_template_combined(self, Student):
+        template = Student.filter_template(
+            ref('teachers.name') == bindparam('teacher_name'))
+        query = Student.filter({'teachers.name': self.teacher1.name})
+        query = Student.filter(template, query).params(teacher_name=self.teacher2.name)
+        assert query.first() is None
+        query = Student.filter({'id': self.student1.id})
+        query = Student.filter(template, query).params(teacher_name=self.teacher1.name)
+        assert query.one().id == self.student1.id
+
+    def test_filter_template_typed_parameter(self, Classroom):
+        template = Classroom.filter_template(ref('color') == bindparam('color'))
+        classroom = Classroom.filter({'id': self.classroom1.id}).one()
+        classroom.update(color="#00FF00").save()
+        try:
+            assert Classroom.filter(template).params(
+                color="#00FF00").one().id == self.classroom1.id
+        finally:
+            classroom.update(color=None).save()
+
+    def test_filter_spatial_dwithin(self, School, Classroom):
+        # ~ 111 km per degree latitude
+        assert School.filter({
+            'location': DWithin((10.0, 21.0), 112000)
+        }).one().id == self.school.id
+        assert School.filter({
+            'location': DWithin((10.0, 21.0), 110000)
+        }).count() == 0
+        assert Classroom.filter({
+            'school.location': DWithin((10.0, 20.0), 1)
+        }).count() == 2
+
+    def test_filter_spatial_bbox(self, School):
+        assert School.filter({
+            'location': BBox(9, 19, 11, 21)
+        }).one().id == self.school.id
+        assert School.filter({'location': BBox(0, 0, 1, 1)}).count() == 0
+
+    def test_filter_spatial_area(self, School, Teacher):
+        assert School.filter({
+            'area': Contains((10, 20))
+        }).one().id == self.school.id
+        assert School.filter({'area': Contains((40, 20))}).count() == 0
+        assert School.filter({
+            'area': Intersects([(25, 25), (25, 35), (35, 35), (25, 25)])
+        }).one().id == self.school.id
+        assert Teacher.filter({
+            'classroom.school.location': Within(
+                [(5, 15), (5, 25), (15, 25), (15, 15), (5, 15)])
+        }).count() == 2
+
+    def test_filter_spatial_list(self, School):
+        far = DWithin((-50, -50), 1)
+        near = DWithin((10, 20), 1)
+        # "or" logic for *_to_one
+        assert School.filter({'location': [far, near]}).count() == 1
+        # "and" logic for *_to_many
+        for strategy in ('join', 'exists'):
+            assert School.filter({
+                'classrooms.school.location': [far, near]
+            }, strategy=strategy).count() == 0
+            assert School.filter({
+                'classrooms.school.location': [BBox(0, 0, 20, 30), near]
+            }, strategy=strategy).count() == 1
+
+    def test_filter_spatial_invalid(self, School):
+        with pytest.raises(ValueError):
+            BBox(0, 0, 200, 0)
+        with pytest.raises(AssertionError):
+            School.filter({'location': [DWithin((10, 20), 1), None]})
@@ -1,11 +1,19 @@
+import json
 import hashlib
 from uuid import uuid4
 import pytest
-from sqlalchemy import and_
+from sqlalchemy import and_, event
+from sqlalchemy.orm import load_only
 from faker import Faker
+from painless_sqlalchemy import SESSION_EVENTS, ENGINE_EVENTS
+from painless_sqlalchemy.cache.MemoryCache import MemoryCache
+from painless_sqlalchemy.core.Model import Model
 from painless_sqlalchemy.elements.ColumnReference import ref
+from painless_sqlalchemy.elements.SpatialOperator import nearest
 from painless_sqlalchemy.util.DictUtil import flatten_dict
+from painless_sqlalchemy.util.LocationUtil import haversine
 from tests.AbstractTest import AbstractTest
+from tests.conftest import db
 
 fake = Faker()
 
@@ -306,3 +314,392 @@ class TestModelSerialization(AbstractTest):
         assert hashlib.md5(
             (str(self.student1.id)).encode()
         ).hexdigest() == no_context_id
+
+    def test_expand(self, Student):
+        assert Student.expand('teachers(id,classroom(id,color)),name') == [
+            'teachers.id', 'teachers.classroom.id', 'teachers.classroom.color', 'name'
+        ]
+        assert Student.expand('contact_info.*,teachers.*') == [
+            'contact_info.phone', 'contact_info.home_phone', 'contact_info.email', 'teachers.id'
+        ]
+
+    def test_expand_star_suffix(self, Student):
+        # only a full "*" segment is expanded
+        assert Student.expand('teachers.name*') == ['teachers.name*']
+        with pytest.raises(AttributeError):
+            Student.serialize(to_return=['teachers.name*'])
+
+    def test_expand_returns_copy(self, Student):
+        Student.expand('name,phone').append('email')
+        assert Student.expand('name,phone') == ['name', 'phone']
+
+    def test_expand_malformed(self, Student):
+        for key in ['name(', 'name)', 'teachers(name)id', '(name)', 'name,,id', 'teachers()', '']:
+            with pytest.raises(ValueError):
+                Student.expand(key)
+
+    def test_exposure_index(self, Student):
+        index = Student._get_exposure_index()
+        assert index['name'] is True
+        assert index['id'] is False
+        assert index['contact_info.phone'] is True
+        assert index['phone_numbers'] is True
+        assert index['first_name'] is True
+
+    def test_is_exposed_column(self, Teacher):
+        for field in [
+            'id', 'name', 'classroom_id', 'students.id', 'students.guardian_number',
+            'students.contact_info.email', 'classroom.teacher.classroom_id',
+            'students.teachers.classroom.school.id'
+        ]:
+            assert Teacher._is_exposed_column(field) == Teacher._get_column_exposure(field)
+        with pytest.raises(AttributeError):
+            Teacher._is_exposed_column('students.%s' % uuid4().hex)
+
+    def test_serialization_plan_cached(self, Teacher):
+        _, plan1 = Teacher._ser(to_return=['name', 'students.name'])
+        _, plan2 = Teacher._ser(to_return=['name', 'students.name'])
+        assert plan1 is plan2
+        _, plan3 = Teacher._ser(
+            to_return=['name', 'students.name'], expose_all=True)
+        assert plan1 is not plan3
+        assert set(plan1.fields) == {'name', 'students.name'}
+        assert plan1.attr_hierarchy == {'name': {}, 'students': {'name': {}}}
+
+    def test_dict_builder_cached(self, Teacher, Student):
+        hierarchy = {'name': {}, 'students': {'name': {}}}
+        builder = Teacher._get_dict_builder(hierarchy)
+        assert builder is Teacher._get_dict_builder(
+            {'students': {'name': {}}, 'name': {}})
+        assert builder is not Student._get_dict_builder(hierarchy)
+        teacher = Teacher.filter({'id': self.teacher.id}).one()
+        assert teacher._as_dict(teacher, hierarchy) == {
+            'name': self.teacher.name,
+            'students': [{'name': s.name} for s in teacher.students]
+        }
+        assert teacher._as_dict([teacher], hierarchy) == [
+            teacher._as_dict(teacher, hierarchy)]
+
+    def test_serialize_row_shape_args_invalid(self, School):
+        for kwargs in [{'keyset': True}, {'total': True}, {'cursor': []}]:
+            with pytest.raises(TypeError):
+                School.serialize(to_return=['id'], **kwargs)
+            with pytest.raises(TypeError):
+                list(School.serialize_iter(to_return=['id'], **kwargs))
+            with pytest.raises(TypeError):
+                School.serialize_core(to_return=['id'], **kwargs)
+            with pytest.raises(TypeError):
+                School.serialize_json(to_return=['id'], **kwargs)
+
+    def test_serialize_iter(self, School):
+        to_return = ['id', 'classrooms.teacher.name']
+        result = School.serialize_iter(
+            to_return=to_return,
+            filter_by={'id': self.school.id},
+            batch_size=1
+        )
+        assert not isinstance(result, list)
+        assert list(result) == School.serialize(
+            to_return=to_return,
+            filter_by={'id': self.school.id}
+        )
+
+    def test_serialize_iter_order_by(self, Student):
+        students = list(Student.serialize_iter(
+            to_return=['name'], order_by=Student.name, batch_size=1))
+        assert students == Student.serialize(
+            to_return=['name'], order_by=Student.name)
+
+    def test_serialize_keyset(self, Student):
+        for order_by in [
+            Student.name,
+            Student.name.desc(),
+            (Student.address, Student.name),
+            (Student.address.desc().nullslast(), Student.name)
+        ]:
+            expected = Student.serialize(
+                to_return=['name', 'address'], order_by=order_by)
+            result, cursor = [], None
+            for _ in range(len(expected) + 1):
+                page, cursor = Student.serialize_keyset(
+                    to_return=['name', 'address'],
+                    limit=1,
+                    cursor=cursor,
+                    order_by=order_by
+                )
+                result += page
+                if cursor is None:
+                    break
+            assert cursor is None
+            assert result == expected
+
+    def test_serialize_keyset_invalid_cursor(self, Student):
+        with pytest.raises(ValueError):
+            Student.serialize_keyset(to_return=['name'], limit=1, cursor="x")
+
+    def test_serialize_core(self, School, Student):
+        for model, to_return, filter_by in [
+            (School, ['id', 'classrooms.teacher.name', 'location'], {'id': self.school.id}),
+            (Student, ['contact_info.*', 'first_name', 'teachers(name)'], {'id': self.student1.id}),
+            (Student, ['name', 'guardian_number', 'phone_numbers'], None)
+        ]:
+            assert model.serialize_core(
+                to_return=to_return, filter_by=filter_by
+            ) == model.serialize(to_return=to_return, filter_by=filter_by)
+
+    def test_serialize_core_nested_to_many(self, Teacher):
+        teachers = Teacher.serialize_core(
+            to_return=['name', 'students.name'],
+            filter_by={'id': self.teacher.id}
+        )
+        assert len(teachers) == 1
+        assert teachers[0]['name'] == self.teacher.name
+        assert sorted(s['name'] for s in teachers[0]['students']) == sorted([
+            self.student1.name, self.student2.name
+        ])
+
+    def test_serialize_core_limit_and_params(self, Student):
+        context = uuid4().hex
+        students = Student.serialize_core(
+            to_return=['contextual_id'],
+            filter_by={'id': self.student1.id},
+            params={'context': context},
+            limit=1
+        )
+        assert students == [{'contextual_id': hashlib.md5(
+            (context + str(self.student1.id)).encode()).hexdigest()}]
+
+    def test_serialize_json(self, School, Student):
+        for model, to_return, filter_by in [
+            (School, ['id', 'classrooms.teacher.name', 'location'], {'id': self.school.id}),
+            (Student, ['contact_info.*', 'first_name', 'teachers(name)'], {'id': self.student1.id}),
+            (Student, ['name', 'guardian_number', 'phone_numbers'], None)
+        ]:
+            assert json.loads(model.serialize_json(
+                to_return=to_return, filter_by=filter_by
+            )) == json.loads(json.dumps(model.serialize(
+                to_return=to_return, filter_by=filter_by)))
+
+    def test_serialize_json_empty(self, Student):
+        assert Student.serialize_json(
+            to_return=['name'], filter_by={'id': -1}) == "[]"
+
+    def test_serialize_json_limit_and_params(self, Student):
+        context = uuid4().hex
+        students = Student.serialize_json(
+            to_return=['contextual_id'],
+            filter_by={'id': self.student1.id},
+            params={'context': context},
+            limit=1
+        )
+        assert json.loads(students) == [{'contextual_id': hashlib.md5(
+            (context + str(self.student1.id)).encode()).hexdigest()}]
+
+    def test_serialize_page(self, Student):
+        students = Student.serialize(to_return=['name'], order_by=Student.name)
+        for limit, offset in [(None, None), (1, None), (1, 1), (5, 0)]:
+            items, total = Student.serialize_page(
+                to_return=['name'], order_by=Student.name,
+                limit=limit, offset=offset)
+            assert total == len(students)
+            assert items == students[offset or 0:][:limit]
+
+    def test_serialize_page_out_of_range(self, Student):
+        total = len(Student.serialize(to_return=['name']))
+        assert Student.serialize_page(
+            to_return=['name'], limit=1, offset=total) == ([], total)
+        assert Student.serialize_page(
+            to_return=['name'], filter_by={'id': -1}, limit=1) == ([], 0)
+
+    def test_serialize_page_filter_to_many(self, Student):
+        items, total = Student.serialize_page(
+            to_return=['name'],
+            filter_by={'teachers.name': self.teacher.name},
+            limit=1
+        )
+        assert len(items) == 1
+        assert total == 2
+
+    def test_serialize_page_joined_to_many(self, Teacher):
+        to_return = ['id', 'students.name']
+        expected = Teacher.serialize(to_return=to_return, order_by=Teacher.id)
+        for load_strategy in ['joined', {'students': 'joined'}]:
+            items, total = Teacher.serialize_page(
+                to_return=to_return, order_by=Teacher.id,
+                load_strategy=load_strategy)
+            assert total == len(expected)
+            assert items == expected
+
+    def test_freshness(self, Student):
+        Student.session.rollback()
+        to_return, filter_by = ['name'], {'id': self.student1.id}
+        student = Student.filter(filter_by).one()
+        name = student.name
+        Student.engine.execute(Student.__table__.update().where(
+            Student.id == self.student1.id).values(name=fake.name()))
+        try:
+            assert Student.serialize(
+                to_return=to_return, filter_by=filter_by, freshness='identity'
+            ) == [{'name': name}]
+            assert Student.serialize(
+                to_return=to_return, filter_by=filter_by
+            ) != [{'name': name}]
+        finally:
+            Student.engine.execute(Student.__table__.update().where(
+                Student.id == self.student1.id).values(name=name))
+            Student.session.rollback()
+
+    def test_freshness_unloaded(self, Student):
+        Student.session.rollback()
+        filter_by = {'id': self.student1.id}
+        student = Student.filter(filter_by).options(load_only('id')).one()
+        assert 'phone' not in student.__dict__
+        assert Student.serialize(
+            to_return=['phone'], filter_by=filter_by, freshness='identity'
+        ) == [{'phone': self.student1.phone}]
+
+    def test_freshness_invalid(self, Student):
+        with pytest.raises(AssertionError):
+            Student.serialize(to_return=['name'], freshness='unknown')
+
+    def test_serialize_unique_rows(self, Teacher):
+        query, _ = Teacher._ser(to_return=['name'], filter_by={'name': self.teacher.name})
+        assert "DISTINCT" not in str(query)
+        query, _ = Teacher._ser(
+            to_return=['name'], filter_by={'students.name': self.student1.name})
+        assert "DISTINCT" in str(query)
+        query, _ = Teacher._ser(
+            to_return=['name'], filter_by={'students.name': self.student1.name},
+            filter_strategy='exists')
+        assert "DISTINCT" not in str(query)
+
+    def test_serialize_filter_strategy(self, Teacher, Student):
+        for model, filter_by, order_by in [
+            (Teacher, {'students.id': [self.student1.id, self.student2.id]}, None),
+            (Student, {'teachers.name': self.teacher.name}, Student.name),
+        ]:
+            expected = model.serialize(
+                to_return=['name'], filter_by=filter_by, order_by=order_by)
+            assert model.serialize(
+                to_return=['name'], filter_by=filter_by, order_by=order_by,
+                filter_strategy='exists') == expected
+            for limit, offset in [(1, None), (1, 1)]:
+                assert model.serialize_page(
+                    to_return=['name'], filter_by=filter_by, order_by=order_by,
+                    limit=limit, offset=offset, filter_strategy='exists'
+                ) == (expected[offset or 0:][:limit], len(expected))
+
+    def test_serialize_cached(self, Teacher):
+        factory = db.session.session_factory
+        assert not any(  # hooks are only registered with cache
+            event.contains(factory, name, fn)
+            for name, fn in SESSION_EVENTS.items())
+        assert not any(
+            event.contains(db.engine, name, fn)
+            for name, fn in ENGINE_EVENTS.items())
+        db.set_cache(MemoryCache())
+        try:
+            to_return = ['name', 'students.name']
+            filter_by = {'id': self.teacher.id}
+            expected = Teacher.serialize(to_return=to_return, filter_by=filter_by)
+            assert Teacher.serialize(to_return=to_return, filter_by=filter_by) == expected
+            assert len(Model.cache._entries) == 1  # pylint: disable=W0212
+            # committed change invalidates result
+            teacher = Teacher.filter({'id': self.teacher.id}).one()
+            name = teacher.name
+            teacher.update(name=fake.name()).save()
+            result = Teacher.serialize(to_return=to_return, filter_by=filter_by)
+            assert result[0]['name'] == teacher.name
+            teacher.update(name=name).save()
+            assert Teacher.serialize(to_return=to_return, filter_by=filter_by) == expected
+        finally:
+            db.set_cache(None)
+
+    def test_serialize_cached_core_writes(self, Teacher):
+        Teacher.session.rollback()
+        db.set_cache(MemoryCache())
+        table = Teacher.__table__
+        to_return, filter_by = ['name'], {'id': self.teacher.id}
+        name = Teacher.serialize(to_return=to_return, filter_by=filter_by)[0]['name']
+        try:
+            for i, write in enumerate([
+                    lambda v: Teacher.engine.execute(table.update().where(
+                        table.c.id == self.teacher.id).values(name=v)),
+                    lambda v: Teacher.session.execute(table.update().where(
+                        table.c.id == self.teacher.id).values(name=v)),
+                    lambda v: Teacher.filter(filter_by).update(
+                        {'name': v}, synchronize_session=False)
+            ]):
+                Teacher.serialize(to_return=to_return, filter_by=filter_by)
+                write("%s %d" % (name, i))
+                # uncommitted changes bypass the cache
+                assert Teacher.serialize(
+                    to_return=to_return, filter_by=filter_by
+                )[0]['name'] == "%s %d" % (name, i)
+                Teacher.session.commit()
+                assert Teacher.serialize(
+                    to_return=to_return, filter_by=filter_by
+                )[0]['name'] == "%s %d" % (name, i)
+        finally:
+            Teacher.session.rollback()
+            Teacher.engine.execute(table.update().where(
+                table.c.id == self.teacher.id).values(name=name))
+            db.set_cache(None)
+
+    def test_load_strategy(self, School):
+        to_return = ['id', 'classrooms.color', 'classrooms.teacher.name']
+        query, _ = School._ser(to_return=to_return)
+        assert "JOIN classroom" not in str(query)
+        query, _ = School._ser(
+            to_return=to_return, load_strategy={'classrooms': 'joined'})
+        assert "JOIN classroom" in str(query)
+        expected = School.serialize(
+            to_return=to_return, filter_by={'id': self.school.id})
+        for load_strategy in ['joined', 'selectin', 'subquery', {
+            'classrooms': 'subquery', 'classrooms.teacher': 'selectin'
+        }]:
+            assert School.serialize(
+                to_return=to_return,
+                filter_by={'id': self.school.id},
+                load_strategy=load_strategy
+            ) == expected
+
+    def test_load_strategy_invalid(self, School):
+        with pytest.raises(AssertionError):
+            School.serialize(to_return=['classrooms.color'], load_strategy='lazy')
+
+    def test_serialize_nearest(self, School, Classroom):
+        school = School.filter({'id': self.school.id}).one()
+        school.update(location=(10.0, 20.0)).save()
+        try:
+            distance = nearest('school.location', (10.0, 21.0))
+            expected = [{
+                'id': self.classroom.id,
+                'distance': pytest.approx(haversine(10, 20, 10, 21), rel=0.01)
+            }]
+            assert Classroom.serialize(
+                to_return=['id'], order_by=distance,
+                extra_fields={'distance': distance}) == expected
+            assert Classroom.serialize_page(
+                to_return=['id'], order_by=distance, limit=1,
+                extra_fields={'distance': distance}) == (expected, 1)
+            page, cursor = Classroom.serialize_keyset(
+                to_return=['id'], order_by=distance, limit=1,
+                extra_fields={'distance': distance})
+            assert page == expected
+            assert Classroom.serialize_keyset(
+                to_return=['id'], order_by=distance, limit=1, cursor=cursor,
+                extra_fields={'distance': distance}) == ([], None)
+            # *_to_many join (not unique per model)
+            distance = nearest('location', (10.0, 21.0))
+            assert School.serialize(
+                to_return=['id'], order_by=distance,
+                filter_by={'classrooms.id': self.classroom.id},
+                extra_fields={'distance': distance}
+            ) == [dict(expected[0], id=self.school.id)]
+        finally:
+            school.update(location=None).save()
+
+    def test_serialize_extra_fields_invalid(self, School):
+        with pytest.raises(AssertionError):
+            School.serialize(to_return=['id'], extra_fields={'id': School.id})
@@ -0,0 +1,52 @@
+import io
+import csv
+import datetime
+import pytest
+from painless_sqlalchemy.util.CopyUtil import encode_value, read_csv, CopyStream
+
+
+class TestCopyUtil():
+
+    def test_encode_value(self):
+        assert encode_value(None) == ''
+        assert encode_value('') == '""'
+        assert encode_value('a "b"') == '"a ""b"""'
+        assert encode_value(1.5) == '"1.5"'
+        assert encode_value(datetime.date(2020, 1, 2)) == '"2020-01-02"'
+
+    def test_encode_value_bytes(self):
+        assert encode_value(b'\x00\xffa') == '"\\x00ff61"'
+        assert encode_value(memoryview(b'a')) == '"\\x61"'
+
+    def test_encode_value_array(self):
+        assert encode_value([1, 2]) == '"{""1"",""2""}"'
+        assert encode_value([]) == '"{}"'
+        assert encode_value([[1, None], ('a,b', 'c"\\')]) == (
+            '"{{""1"",NULL},{""a,b"",""c\\""\\\\""}}"')
+        # csv decoding yields postgres array literal
+        field = next(csv.reader([encode_value(['a,b', 'c"\\', None])]))[0]
+        assert field == '{"a,b","c\\"\\\\",NULL}'
+
+    def test_encode_value_dict(self):
+        field = encode_value({'a': [1, "b"]})
+        assert next(csv.reader([field]))[0] == '{"a": [1, "b"]}'
+
+    def test_encode_value_unsupported(self):
+        with pytest.raises(TypeError):
+            encode_value(object())
+        with pytest.raises(TypeError):
+            encode_value({1, 2})
+        with pytest.raises(TypeError):
+            encode_value([datetime.timedelta(1)])
+
+    def test_read_csv(self):
+        rows = list(read_csv(io.StringIO('a,b\n"",x\n')))
+        assert rows == [{'a': None, 'b': 'x'}]
+
+    def test_copy_stream(self):
+        stream = CopyStream(
+            [['a'], ['b', 'c']], lambda r: [encode_value(v) for v in r])
+        assert stream.read(4) == '"a"\n'
+        assert stream.read() == '"b","c"\n'
+        assert stream.read() == ''
+        assert stream.count == 2
@@ -0,0 +1,20 @@
+import datetime as dt
+import pytest
+from painless_sqlalchemy.util.CursorUtil import encode_cursor, decode_cursor
+
+
+class TestCursorUtil():
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(("name", None, 1.5, 12))
+        assert isinstance(cursor, str)
+        assert decode_cursor(cursor) == ["name", None, 1.5, 12]
+
+    def test_cursor_datetime(self):
+        cursor = encode_cursor([dt.datetime(2018, 1, 2, 3, 4, 5), 1])
+        assert decode_cursor(cursor) == ["2018-01-02T03:04:05", 1]
+
+    def test_cursor_invalid(self):
+        for cursor in ["invalid", encode_cursor([])[:-2] + "!", None, "e30="]:
+            with pytest.raises(ValueError):
+                decode_cursor(cursor)
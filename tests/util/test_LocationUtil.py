@@ -1,8 +1,18 @@
+import json
+import random
 import unittest
 import pytest
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+from painless_sqlalchemy.columns.AreaType import AreaType
 from painless_sqlalchemy.util import LocationUtil
 
 
+requires_numpy = unittest.skipIf(numpy is None, "requires numpy")
+
+
 class TestLocationUtil(unittest.TestCase):
 
     valid_long_lat = (
@@ -33,6 +43,132 @@ class TestLocationUtil(unittest.TestCase):
         dist = LocationUtil.haversine(pos1[0], pos1[1], pos2[0], pos2[1])
         assert dist == 8102.26550449619 * 1000
 
+    @staticmethod
+    def _random_locations(count, seed):
+        rnd = random.Random(seed)
+        return [
+            (rnd.uniform(-180, 180), rnd.uniform(-90, 90))
+            for _ in range(count)
+        ]
+
+    @requires_numpy
+    def test_haversine_many(self):
+        location = (-119.443606, 49.880134)
+        locations = self._random_locations(100, 1) + [location, (9.17, 47.67)]
+        result = LocationUtil.haversine_many(location, locations)
+        assert result.shape == (102,)
+        for loc, dist in zip(locations, result):
+            assert dist == pytest.approx(LocationUtil.haversine(
+                location[0], location[1], loc[0], loc[1]), abs=1e-6)
+        assert LocationUtil.haversine_many(location, []).shape == (0,)
+
+    @requires_numpy
+    def test_haversine_pairwise(self):
+        locations1 = self._random_locations(100, 2) + [(0, 0)]
+        locations2 = self._random_locations(100, 3) + [(180, 0)]  # antipodal
+        result = LocationUtil.haversine_pairwise(locations1, locations2)
+        for loc1, loc2, dist in zip(locations1, locations2, result):
+            assert dist == pytest.approx(LocationUtil.haversine(
+                loc1[0], loc1[1], loc2[0], loc2[1]), abs=1e-6)
+        with pytest.raises(AssertionError):
+            LocationUtil.haversine_pairwise(locations1, locations2[1:])
+
+    @requires_numpy
+    def test_haversine_matrix(self):
+        locations1 = self._random_locations(30, 4)
+        locations2 = self._random_locations(20, 5)
+        expected = numpy.array([[
+            LocationUtil.haversine(l1[0], l1[1], l2[0], l2[1])
+            for l2 in locations2
+        ] for l1 in locations1])
+        for chunk_size in [None, 1, 7, 20, 10000]:
+            result = LocationUtil.haversine_matrix(
+                locations1, locations2, chunk_size=chunk_size)
+            assert result.shape == (30, 20)
+            numpy.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-6)
+        # chunks bound amount of distances computed at once
+        chunks = list(LocationUtil.iter_haversine_matrix(
+            locations1, locations2, chunk_size=50))
+        assert [offset for offset, _ in chunks] == list(range(0, 30, 2))
+        assert all(chunk.size <= 50 for _, chunk in chunks)
+        assert LocationUtil.haversine_matrix([], locations2).shape == (0, 20)
+
+    @requires_numpy
+    def test_polygon_index(self):
+        rnd = random.Random(8)
+        polygons = [None]
+        for _ in range(50):
+            x, y = rnd.uniform(-10, 10), rnd.uniform(-10, 10)
+            size = rnd.uniform(0.1, 3)
+            polygon = [
+                (x, y), (x + size, y + size / 3), (x + size / 2, y + size),
+                (x + size / 3, y + size / 2), (x, y)
+            ]
+            polygons.append(polygon)
+        locations = self._random_locations(500, 9)
+        locations = [(x / 10, y / 5) for x, y in locations]
+        expected = [[
+            i for i, polygon in enumerate(polygons)
+            if polygon is not None and
+            LocationUtil.point_inside_polygon(x, y, polygon)
+        ] for x, y in locations]
+        assert any(expected)
+        for cell_size in [None, 0.5, 50]:
+            index = LocationUtil.PolygonIndex(polygons, cell_size=cell_size)
+            assert index.query(locations) == expected
+        assert index.query([]) == []
+        assert LocationUtil.PolygonIndex([]).query(locations[:2]) == [[], []]
+
+    @requires_numpy
+    def test_polygon_index_area_type(self):
+        process = AreaType(True).result_processor(None, None)
+        area = process(json.dumps({'type': 'Polygon', 'coordinates': [
+            [[0, 0], [0, 2], [2, 2], [2, 0], [0, 0]]
+        ]}))
+        index = LocationUtil.PolygonIndex([area, process(None)])
+        assert index.query([(1, 1), (3, 1)]) == [[0], []]
+
+    def test_point_index(self):
+        locations = self._random_locations(300, 10) + [
+            (179.99, 0), (-179.99, 0.01), (0, 90), (120, 89.99)]
+        queries = self._random_locations(30, 11) + [
+            (-179.999, 0), (180, 0), (0, -90), (-60, 89.9)]
+        for cell_size in [0.1, 7, 90]:
+            index = LocationUtil.PointIndex(locations, cell_size=cell_size)
+            assert len(index) == len(locations)
+            for query in queries:
+                expected = sorted(
+                    (LocationUtil.haversine(
+                        query[0], query[1], loc[0], loc[1]), key)
+                    for key, loc in enumerate(locations))
+                for k in [0, 1, 5, 1000]:
+                    result = index.knn(query, k)
+                    assert [d for _, d in result] == pytest.approx(
+                        [d for d, _ in expected[:k]])
+                for meters in [0, 5000, 2000000, 30000000]:
+                    result = index.radius(query, meters)
+                    assert sorted(key for key, _ in result) == sorted(
+                        key for d, key in expected if d <= meters)
+                    assert [d for _, d in result] == sorted(
+                        d for _, d in result)
+
+    def test_point_index_insert_remove(self):
+        index = LocationUtil.PointIndex({'a': (10, 10), 'b': None})
+        assert 'a' in index and 'b' not in index
+        index.insert('b', (10.001, 10))
+        index.insert('c', (-10, -10))
+        assert [key for key, _ in index.knn((10, 10), 2)] == ['a', 'b']
+        index.insert('a', (-10, -10.001))  # move
+        assert [key for key, _ in index.knn((10, 10), 2)] == ['b', 'c']
+        index.remove('b')
+        index.remove('unknown')
+        assert len(index) == 2
+        assert [key for key, _ in index.radius((-10, -10), 1000)] == ['c', 'a']
+        assert index.knn((0, 0), 5)[0][1] == pytest.approx(
+            LocationUtil.haversine(0, 0, -10, -10))
+        with pytest.raises(ValueError):
+            index.insert('d', (200, 0))
+
     def test_valid_lat_long(self):
         for (longitude, latitude) in self.valid_long_lat:
             assert LocationUtil.validate_latitude(latitude) == float(latitude)
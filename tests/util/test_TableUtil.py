@@ -1,5 +1,8 @@
-from sqlalchemy import DateTime, Column, func
-from painless_sqlalchemy.util.TableUtil import many_to_many
+from sqlalchemy import DateTime, Column, MetaData, Table, Integer, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from painless_sqlalchemy.columns.LocationType import LocationType
+from painless_sqlalchemy.util.TableUtil import many_to_many, gist_index
 
 
 class TestTableUtil():
@@ -12,3 +15,18 @@ class TestTableUtil():
             )
         ])
         assert result.name == "table_a_to_table_b"
+
+    def test_gist_index(self):
+        table = Table(
+            "place", MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("location", LocationType, nullable=True)
+        )
+        index = gist_index(table.c.location, geography=True)
+        assert index in table.indexes
+        dialect = postgresql.dialect()
+        assert str(dialect.ddl_compiler(dialect, CreateIndex(index))) == (
+            "CREATE INDEX ix_place_location_geog ON place USING gist "
+            "(CAST(location AS geography(GEOMETRY,4326)))"
+        )
+        assert gist_index(table.c.location).name == "ix_place_location_gist"